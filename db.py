@@ -3,6 +3,7 @@ import re
 import psycopg2
 import logging
 from psycopg2 import OperationalError, InterfaceError
+from collections import namedtuple
 from functools import wraps
 from time import sleep
 from dotenv import load_dotenv
@@ -25,6 +26,17 @@ except ImportError:
 # Get the logger from the main module
 logger = logging.getLogger(__name__)
 
+# Dealer's car row with its primary image (None if it has none)
+DealerCar = namedtuple('DealerCar', 'id make model year available image')
+# Car row with its dealer, as shown to customers
+CarDetails = namedtuple('CarDetails', 'id make model year dealer dealer_telegram_id')
+# Customer's active booking with the booked car
+ActiveBooking = namedtuple('ActiveBooking', 'id car_id start_date end_date make model year')
+# Booking row in the admin booking lists
+BookingSummary = namedtuple(
+    'BookingSummary', 'id start_date end_date active customer_name customer_telegram make model year'
+)
+
 # Connection settings
 MAX_RETRIES = 3
 RETRY_DELAY = 1  # seconds
@@ -146,6 +158,7 @@ def get_car_details(car_id):
                 
                 if not car:
                     return None
+                car = CarDetails._make(car)
                 
                 # Get car images
                 cur.execute('SELECT image_url, is_primary FROM car_images WHERE car_id = %s', (car_id,))
@@ -182,7 +195,8 @@ def get_active_booking(customer_id):
                     JOIN cars c ON b.car_id = c.id
                     WHERE b.customer_id = %s AND b.active = true
                 ''', (customer_id,))
-                return cur.fetchone()
+                row = cur.fetchone()
+                return ActiveBooking._make(row) if row else None
     except Exception as e:
         logger.error(f"Error in get_active_booking: {e}")
         return None
@@ -296,7 +310,7 @@ def get_all_bookings(active_only=False, limit=20):
                 
                 logger.info(f"Executing query: {query}")
                 cur.execute(query)
-                bookings = cur.fetchall()
+                bookings = [BookingSummary._make(row) for row in cur.fetchall()]
                 logger.info(f"Found {len(bookings)} bookings")
                 return bookings
     except Exception as e:
@@ -397,7 +411,7 @@ def get_pending_bookings(limit=20):
                     ORDER BY b.start_date DESC
                     LIMIT %s
                 ''', (limit,))
-                return cur.fetchall()
+                return [BookingSummary._make(row) for row in cur.fetchall()]
     except Exception as e:
         logger.error(f"Error in get_pending_bookings: {e}")
         return []
@@ -425,7 +439,7 @@ def get_active_bookings(limit=20):
                     ORDER BY b.start_date DESC
                     LIMIT %s
                 ''', (limit,))
-                return cur.fetchall()
+                return [BookingSummary._make(row) for row in cur.fetchall()]
     except Exception as e:
         logger.error(f"Error in get_active_bookings: {e}")
         return []
@@ -556,26 +570,73 @@ def get_dealer_id(user_id):
         return None
 
 def get_dealer_cars(dealer_id):
-    """Get all cars for a dealer"""
+    """Get all cars for a dealer, each with its primary image (or None)"""
     try:
         with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute('''
                     SELECT 
-                        id, 
-                        make, 
-                        model, 
-                        year, 
-                        available
-                    FROM cars 
-                    WHERE dealer_id = %s
-                    ORDER BY make, model
+                        c.id, 
+                        c.make, 
+                        c.model, 
+                        c.year, 
+                        c.available,
+                        i.image_url
+                    FROM cars c
+                    LEFT JOIN car_images i ON i.car_id = c.id AND i.is_primary
+                    WHERE c.dealer_id = %s
+                    ORDER BY c.make, c.model
                 ''', (dealer_id,))
-                return cur.fetchall()
+                return [DealerCar._make(row) for row in cur.fetchall()]
     except Exception as e:
         logger.error(f"Error in get_dealer_cars: {e}")
         return []
 
+def dealer_owns_car(dealer_id, car_id):
+    """Check whether a car belongs to a dealer
+    
+    Args:
+        dealer_id: ID of the dealer
+        car_id: ID of the car
+        
+    Returns:
+        bool: True if the car exists and belongs to the dealer
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1 FROM cars WHERE id = %s AND dealer_id = %s', (car_id, dealer_id))
+                return cur.fetchone() is not None
+    except Exception as e:
+        logger.error(f"Error in dealer_owns_car: {e}")
+        return False
+
+def get_dealer_car_owned(dealer_id, car_id):
+    """Get a dealer's car with its primary image, if the dealer owns it
+    
+    Args:
+        dealer_id: ID of the dealer
+        car_id: ID of the car
+        
+    Returns:
+        DealerCar: Car with its primary image, or None if not found or not owned
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute('''
+                    SELECT c.id, c.make, c.model, c.year, c.available, i.image_url
+                    FROM cars c
+                    LEFT JOIN car_images i ON i.car_id = c.id AND i.is_primary
+                    WHERE c.id = %s AND c.dealer_id = %s
+                    LIMIT 1
+                ''', (car_id, dealer_id))
+                row = cur.fetchone()
+                return DealerCar._make(row) if row else None
+    except Exception as e:
+        logger.error(f"Error in get_dealer_car_owned: {e}")
+        return None
+
 def get_dealer_stats(dealer_id):
     """Get booking statistics for a dealer"""
     try:
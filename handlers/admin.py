@@ -7,9 +7,11 @@ from aiogram.fsm.state import State, StatesGroup
 
 import db
 from config.config import ADMIN_GROUP_ID, logger
-from utils.helpers import send_or_edit_message, is_admin_group, format_booking_info
-from utils.keyboards import KeyboardFactory
-from messages import Messages
+from utils.helpers import DATETIME_FORMAT, send_or_edit_message, is_admin_group, format_booking_info
+from utils.db_async import run_db
+from utils.keyboards import get_keyboard_factory
+from handlers.dealer import invalidate_dealer_cache
+from messages import get_messages
 
 # Create a router for admin handlers
 router = Router()
@@ -34,11 +36,11 @@ async def admin_command_handler(message: Message, state: FSMContext):
         
     try:
         # Set language to English for admin panel
-        msgs = Messages('en')
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages('en')
+        kb = get_keyboard_factory(msgs)
         
         # Store in state for use in other handlers
-        await state.update_data(language='en', msgs=msgs)
+        await state.update_data(language='en')
         
         # Show admin menu
         await message.answer(
@@ -60,9 +62,8 @@ async def admin_callback_handler(callback_query: CallbackQuery, state: FSMContex
         
     try:
         # Get language configuration from state or create new
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         action = callback_query.data.replace("admin_", "")
         
@@ -90,9 +91,8 @@ async def admin_back_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle admin back button"""
     try:
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Call back_to_admin_menu function
         await back_to_admin_menu(callback_query, state, kb)
@@ -107,7 +107,7 @@ async def show_all_bookings(callback_query: CallbackQuery, state: FSMContext, kb
     """Show all bookings for admin"""
     try:
         # Get bookings from database
-        bookings = db.get_all_bookings()
+        bookings = await run_db(db.get_all_bookings)
         
         if not bookings or len(bookings) == 0:
             await send_or_edit_message(
@@ -124,19 +124,21 @@ async def show_all_bookings(callback_query: CallbackQuery, state: FSMContext, kb
         keyboard = []
         
         for booking in bookings[:10]:  # Limit to first 10 bookings
-            booking_id = booking[0]
-            start_date = booking[1].strftime("%Y-%m-%d %H:%M") if booking[1] else "N/A"
-            end_date = booking[2].strftime("%Y-%m-%d %H:%M") if booking[2] else "Active"
-            active = "✅ Active" if booking[3] else "❌ Completed"
-            customer = booking[4]
-            car_info = f"{booking[6]} {booking[7]} ({booking[8]})"
+            booking_id = booking.id
+            start_date = booking.start_date.strftime(DATETIME_FORMAT) if booking.start_date else "N/A"
+            end_date = booking.end_date.strftime(DATETIME_FORMAT) if booking.end_date else "Active"
+            active = "✅ Active" if booking.active else "❌ Completed"
+            customer = booking.customer_name
+            car_info = f"{booking.make} {booking.model} ({booking.year})"
             
-            text += f"🔹 Booking #{booking_id}\n"
-            text += f"👤 Customer: {customer}\n"
-            text += f"🚗 Car: {car_info}\n"
-            text += f"📅 From: {start_date}\n"
-            text += f"📅 To: {end_date}\n"
-            text += f"Status: {active}\n\n"
+            text += (
+                f"🔹 Booking #{booking_id}\n"
+                f"👤 Customer: {customer}\n"
+                f"🚗 Car: {car_info}\n"
+                f"📅 From: {start_date}\n"
+                f"📅 To: {end_date}\n"
+                f"Status: {active}\n\n"
+            )
             
             # Add action buttons for this booking
             keyboard.append([
@@ -178,7 +180,7 @@ async def show_pending_bookings(callback_query: CallbackQuery, state: FSMContext
     """Show pending bookings for admin to approve/reject"""
     try:
         # Get pending bookings from database
-        pending_bookings = db.get_pending_bookings()
+        pending_bookings = await run_db(db.get_pending_bookings)
         
         if not pending_bookings or len(pending_bookings) == 0:
             await send_or_edit_message(
@@ -195,15 +197,17 @@ async def show_pending_bookings(callback_query: CallbackQuery, state: FSMContext
         keyboard = []
         
         for booking in pending_bookings:
-            booking_id = booking[0]
-            start_date = booking[1].strftime("%Y-%m-%d %H:%M") if booking[1] else "N/A"
-            customer = booking[4]
-            car_info = f"{booking[6]} {booking[7]} ({booking[8]})"
+            booking_id = booking.id
+            start_date = booking.start_date.strftime(DATETIME_FORMAT) if booking.start_date else "N/A"
+            customer = booking.customer_name
+            car_info = f"{booking.make} {booking.model} ({booking.year})"
             
-            text += f"🔹 Booking #{booking_id}\n"
-            text += f"👤 Customer: {customer}\n"
-            text += f"🚗 Car: {car_info}\n"
-            text += f"📅 From: {start_date}\n\n"
+            text += (
+                f"🔹 Booking #{booking_id}\n"
+                f"👤 Customer: {customer}\n"
+                f"🚗 Car: {car_info}\n"
+                f"📅 From: {start_date}\n\n"
+            )
             
             # Add approve/reject buttons for this booking
             keyboard.append([
@@ -240,7 +244,7 @@ async def show_active_bookings(callback_query: CallbackQuery, state: FSMContext,
     """Show active bookings for admin to manage"""
     try:
         # Get active bookings from database
-        active_bookings = db.get_active_bookings()
+        active_bookings = await run_db(db.get_active_bookings)
         
         if not active_bookings or len(active_bookings) == 0:
             await send_or_edit_message(
@@ -257,15 +261,17 @@ async def show_active_bookings(callback_query: CallbackQuery, state: FSMContext,
         keyboard = []
         
         for booking in active_bookings:
-            booking_id = booking[0]
-            start_date = booking[1].strftime("%Y-%m-%d %H:%M") if booking[1] else "N/A"
-            customer = booking[4]
-            car_info = f"{booking[6]} {booking[7]} ({booking[8]})"
+            booking_id = booking.id
+            start_date = booking.start_date.strftime(DATETIME_FORMAT) if booking.start_date else "N/A"
+            customer = booking.customer_name
+            car_info = f"{booking.make} {booking.model} ({booking.year})"
             
-            text += f"🔹 Booking #{booking_id}\n"
-            text += f"👤 Customer: {customer}\n"
-            text += f"🚗 Car: {car_info}\n"
-            text += f"📅 From: {start_date}\n\n"
+            text += (
+                f"🔹 Booking #{booking_id}\n"
+                f"👤 Customer: {customer}\n"
+                f"🚗 Car: {car_info}\n"
+                f"📅 From: {start_date}\n\n"
+            )
             
             # Add action buttons for this booking
             keyboard.append([
@@ -303,15 +309,14 @@ async def approve_booking_handler(callback_query: CallbackQuery, state: FSMConte
         
     try:
         # Get keyboard factory
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract booking ID from callback data
         booking_id = int(callback_query.data.replace("approve_booking_", ""))
         
         # Approve booking in database
-        success, message = db.approve_booking(booking_id)
+        success, message = await run_db(db.approve_booking, booking_id)
         
         if success:
             # Notify admin
@@ -324,8 +329,7 @@ async def approve_booking_handler(callback_query: CallbackQuery, state: FSMConte
             
     except Exception as e:
         logger.error(f"Error in approve_booking_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while approving the booking.",
             reply_markup=kb.admin_menu_keyboard()
@@ -340,15 +344,14 @@ async def reject_booking_handler(callback_query: CallbackQuery, state: FSMContex
         
     try:
         # Get keyboard factory
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract booking ID from callback data
         booking_id = int(callback_query.data.replace("reject_booking_", ""))
         
         # Reject booking in database
-        success, message = db.reject_booking(booking_id)
+        success, message = await run_db(db.reject_booking, booking_id)
         
         if success:
             # Notify admin
@@ -361,8 +364,7 @@ async def reject_booking_handler(callback_query: CallbackQuery, state: FSMContex
             
     except Exception as e:
         logger.error(f"Error in reject_booking_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while rejecting the booking.",
             reply_markup=kb.admin_menu_keyboard()
@@ -401,8 +403,7 @@ async def delete_booking_handler(callback_query: CallbackQuery, state: FSMContex
         
     except Exception as e:
         logger.error(f"Error in delete_booking_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while preparing to delete the booking.",
             reply_markup=kb.admin_menu_keyboard()
@@ -417,15 +418,14 @@ async def confirm_delete_booking_handler(callback_query: CallbackQuery, state: F
         
     try:
         # Get keyboard factory
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract booking ID from callback data
         booking_id = int(callback_query.data.replace("confirm_delete_booking_", ""))
         
         # Delete booking in database
-        success, message = db.admin_delete_booking(booking_id)
+        success, message = await run_db(db.admin_delete_booking, booking_id)
         
         if success:
             # Notify admin
@@ -452,8 +452,7 @@ async def confirm_delete_booking_handler(callback_query: CallbackQuery, state: F
             
     except Exception as e:
         logger.error(f"Error in confirm_delete_booking_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while deleting the booking.",
             reply_markup=kb.admin_menu_keyboard()
@@ -463,7 +462,7 @@ async def show_all_dealers(callback_query: CallbackQuery, state: FSMContext, kb)
     """Show all dealers for admin"""
     try:
         # Get dealers from database
-        dealers = db.get_all_dealers()
+        dealers = await run_db(db.get_all_dealers)
         
         if not dealers or len(dealers) == 0:
             # No dealers found, show message with option to add one
@@ -490,8 +489,10 @@ async def show_all_dealers(callback_query: CallbackQuery, state: FSMContext, kb)
             telegram_id = dealer[1]
             name = dealer[2]
             
-            text += f"🔹 {name} (ID: {dealer_id})\n"
-            text += f"Telegram ID: {telegram_id}\n\n"
+            text += (
+                f"🔹 {name} (ID: {dealer_id})\n"
+                f"Telegram ID: {telegram_id}\n\n"
+            )
             
             # Add delete button for this dealer
             keyboard.append([
@@ -559,9 +560,8 @@ async def add_dealer_name_handler(message: Message, state: FSMContext):
         
     try:
         # Get keyboard factory
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Get dealer name from message
         dealer_name = message.text.strip()
@@ -592,8 +592,7 @@ async def add_dealer_name_handler(message: Message, state: FSMContext):
         
     except Exception as e:
         logger.error(f"Error in add_dealer_name_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await message.answer(
             "❌ An error occurred while processing the dealer name.",
             reply_markup=kb.admin_menu_keyboard()
@@ -608,9 +607,8 @@ async def add_dealer_telegram_id_handler(message: Message, state: FSMContext):
         
     try:
         # Get keyboard factory
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Get dealer Telegram ID from message
         telegram_id_str = message.text.strip()
@@ -632,9 +630,12 @@ async def add_dealer_telegram_id_handler(message: Message, state: FSMContext):
         dealer_name = data.get('dealer_name')
         
         # Add dealer to database
-        success, result = db.add_dealer(telegram_id, dealer_name)
+        success, result = await run_db(db.add_dealer, telegram_id, dealer_name)
         
         if success:
+            # Drop any cached "not a dealer" answer for this user
+            invalidate_dealer_cache(telegram_id)
+            
             # Show success message
             await message.answer(
                 f"✅ Dealer {dealer_name} (Telegram ID: {telegram_id}) added successfully.",
@@ -652,14 +653,14 @@ async def add_dealer_telegram_id_handler(message: Message, state: FSMContext):
         
     except Exception as e:
         logger.error(f"Error in add_dealer_telegram_id_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await message.answer(
             "❌ An error occurred while processing the dealer Telegram ID.",
             reply_markup=kb.admin_menu_keyboard()
         )
 
-@router.callback_query(lambda c: c.data.startswith("delete_dealer_"))
+# Dealer car deletion callbacks share this prefix and belong to the dealer router
+@router.callback_query(F.data.startswith("delete_dealer_") & ~F.data.startswith("delete_dealer_car_"))
 async def delete_dealer_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle dealer deletion"""
     if not is_admin_group(callback_query.message):
@@ -692,14 +693,13 @@ async def delete_dealer_handler(callback_query: CallbackQuery, state: FSMContext
         
     except Exception as e:
         logger.error(f"Error in delete_dealer_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while preparing to delete the dealer.",
             reply_markup=kb.admin_menu_keyboard()
         )
 
-@router.callback_query(lambda c: c.data.startswith("confirm_delete_dealer_"))
+@router.callback_query(F.data.startswith("confirm_delete_dealer_") & ~F.data.startswith("confirm_delete_dealer_car_"))
 async def confirm_delete_dealer_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle dealer deletion confirmation"""
     if not is_admin_group(callback_query.message):
@@ -708,17 +708,19 @@ async def confirm_delete_dealer_handler(callback_query: CallbackQuery, state: FS
         
     try:
         # Get keyboard factory
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract dealer ID from callback data
         dealer_id = int(callback_query.data.replace("confirm_delete_dealer_", ""))
         
         # Delete dealer in database
-        success, message = db.delete_dealer(dealer_id)
+        success, message = await run_db(db.delete_dealer, dealer_id)
         
         if success:
+            # The cache is keyed by Telegram ID, so drop all entries
+            invalidate_dealer_cache()
+            
             # Notify admin
             await callback_query.answer("✅ Dealer deleted successfully")
             
@@ -743,8 +745,7 @@ async def confirm_delete_dealer_handler(callback_query: CallbackQuery, state: FS
             
     except Exception as e:
         logger.error(f"Error in confirm_delete_dealer_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while deleting the dealer.",
             reply_markup=kb.admin_menu_keyboard()
@@ -1,4 +1,5 @@
 import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
 from aiogram import F, Router
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
@@ -7,9 +8,11 @@ from aiogram.fsm.state import State, StatesGroup
 
 import db
 from config.config import logger
-from utils.helpers import send_or_edit_message, format_car_info, format_booking_info
-from utils.keyboards import KeyboardFactory
-from messages import Messages
+from utils.helpers import send_or_edit_message, spawn, format_car_info, format_booking_info
+from utils.db_async import run_db
+from utils.keyboards import KeyboardFactory, get_keyboard_factory
+from utils.storage import set_state_and_data, reset_state
+from messages import get_messages
 
 # Create a router for customer handlers
 router = Router()
@@ -31,20 +34,17 @@ async def start_handler(message: Message, state: FSMContext):
     """Handle /start command - first entry point for users"""
     try:
         # Create initial messages and keyboard factory in English
-        msgs = Messages('en')
-        kb = KeyboardFactory(msgs)
-        
-        # Store in state
-        await state.update_data(msgs=msgs, language='en')
+        msgs = get_messages('en')
+        kb = get_keyboard_factory(msgs)
         
         # Check if user is already in the database
         telegram_id = message.from_user.id
-        customer_id = db.get_customer_id(telegram_id)
+        customer_id = await run_db(db.get_customer_id, telegram_id)
         
         if not customer_id:
             # New user, register them
             name = message.from_user.full_name
-            success = db.register_customer(telegram_id, name)
+            success = await run_db(db.register_customer, telegram_id, name)
             if not success:
                 await message.answer("❌ Registration failed. Please try again later.")
                 return
@@ -59,11 +59,11 @@ async def start_handler(message: Message, state: FSMContext):
         await message.answer(welcome_text)
         await message.answer(msgs.get('select_language'), reply_markup=kb.language_keyboard())
         
-        # Set state to language selection
-        await state.set_state(CustomerStates.selecting_language)
+        # Store language and set state to language selection
+        await set_state_and_data(state, CustomerStates.selecting_language, language='en')
         
     except Exception as e:
-        logger.error(f"Error in start_handler: {e}")
+        logger.error("Error in start_handler: %s", e)
         await message.answer("❌ An error occurred. Please try again later.")
 
 
@@ -75,11 +75,8 @@ async def language_callback_handler(callback_query: CallbackQuery, state: FSMCon
         lang_code = callback_query.data.split('_')[1]
         
         # Update language
-        msgs = Messages(lang_code)
-        kb = KeyboardFactory(msgs)
-        
-        # Store language in state
-        await state.update_data(language=lang_code, msgs=msgs)
+        msgs = get_messages(lang_code)
+        kb = get_keyboard_factory(msgs)
         
         # Send confirmation and show main menu
         await callback_query.answer(msgs.get('language_changed'))
@@ -91,11 +88,11 @@ async def language_callback_handler(callback_query: CallbackQuery, state: FSMCon
             reply_markup=kb.main_menu_keyboard()
         )
         
-        # Clear state
-        await state.clear()
+        # Clear state, keeping only the new language
+        await reset_state(state, language=lang_code)
         
     except Exception as e:
-        logger.error(f"Error in language_callback_handler: {e}")
+        logger.error("Error in language_callback_handler: %s", e)
         await callback_query.message.answer("❌ An error occurred. Please try again later.")
 
 
@@ -105,13 +102,12 @@ async def list_cars_command_handler(callback_query: CallbackQuery, state: FSMCon
     try:
         logger.info("list_cars_command handler called")
         # Get language configuration from state or create new
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Get available cars - we'll store them in state for pagination
-        cars = db.get_available_cars(limit=100)  # Fetch more cars
-        logger.info(f"Found {len(cars)} available cars")
+        cars = await run_db(db.get_available_cars, limit=100)  # Fetch more cars
+        logger.info("Found %s available cars", len(cars))
         
         if not cars:
             await send_or_edit_message(
@@ -121,9 +117,6 @@ async def list_cars_command_handler(callback_query: CallbackQuery, state: FSMCon
             )
             return
             
-        # Store cars in state for pagination
-        await state.update_data(cars=cars, current_page=0)
-        
         # Show first page of cars
         await send_or_edit_message(
             callback_query,
@@ -131,14 +124,13 @@ async def list_cars_command_handler(callback_query: CallbackQuery, state: FSMCon
             reply_markup=kb.car_list_keyboard(cars, page=0)
         )
         
-        # Set state to viewing cars
-        await state.set_state(CustomerStates.viewing_cars)
+        # Store cars in state for pagination and set state to viewing cars
+        await set_state_and_data(state, CustomerStates.viewing_cars, cars=cars, current_page=0)
         logger.info("State set to viewing_cars")
         
-    except Exception as e:
-        logger.error(f"Error in list_cars_command_handler: {e}", exc_info=True)
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+    except Exception:
+        logger.exception("Error in list_cars_command_handler")
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while listing cars. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -151,8 +143,8 @@ async def back_to_car_list_handler(callback_query: CallbackQuery, state: FSMCont
     try:
         # Get language configuration from state
         state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(state_data.get('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Get the cars from state that were previously loaded
         cars = state_data.get('cars', [])
@@ -160,7 +152,7 @@ async def back_to_car_list_handler(callback_query: CallbackQuery, state: FSMCont
         
         if not cars:
             # If no cars in state, fetch them again
-            cars = db.get_available_cars(limit=100)  # Fetch more cars
+            cars = await run_db(db.get_available_cars, limit=100)  # Fetch more cars
             current_page = 0
             await state.update_data(cars=cars, current_page=current_page)
             
@@ -183,10 +175,8 @@ async def back_to_car_list_handler(callback_query: CallbackQuery, state: FSMCont
         await state.set_state(CustomerStates.viewing_cars)
         
     except Exception as e:
-        logger.error(f"Error in back_to_car_list_handler: {e}")
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        logger.error("Error in back_to_car_list_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred. Going back to main menu.",
             reply_markup=kb.main_menu_keyboard()
@@ -199,8 +189,8 @@ async def car_page_handler(callback_query: CallbackQuery, state: FSMContext):
     try:
         # Get language configuration from state
         state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(state_data.get('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract page number from callback data
         page = int(callback_query.data.replace("car_page_", ""))
@@ -227,9 +217,8 @@ async def car_page_handler(callback_query: CallbackQuery, state: FSMContext):
         )
         
     except Exception as e:
-        logger.error(f"Error in car_page_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in car_page_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while changing pages. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -240,28 +229,27 @@ async def car_page_handler(callback_query: CallbackQuery, state: FSMContext):
 async def car_details_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle car selection to show details"""
     try:
-        logger.info(f"Car details handler called with data: {callback_query.data}")
+        logger.info("Car details handler called with data: %s", callback_query.data)
         
         # Acknowledge the callback immediately
         await callback_query.answer("Loading car details...")
         
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract car_id from callback data
         car_id = int(callback_query.data.split('_')[1])
-        logger.info(f"Showing details for car ID: {car_id}")
+        logger.info("Showing details for car ID: %s", car_id)
         
         # Store the current car_id in state for potential booking
         await state.update_data(current_car_id=car_id)
         
         # Get car details
-        car_details = db.get_car_details(car_id)
+        car_details = await run_db(db.get_car_details, car_id)
         
         if not car_details:
-            logger.warning(f"Car not found: {car_id}")
+            logger.warning("Car not found: %s", car_id)
             await send_or_edit_message(
                 callback_query,
                 msgs.get('car_not_found'),
@@ -274,10 +262,10 @@ async def car_details_handler(callback_query: CallbackQuery, state: FSMContext):
         
         # Format car details
         car_info = msgs.get('car_details', 
-                           make=car[1], 
-                           model=car[2], 
-                           year=car[3], 
-                           dealer=car[4])
+                           make=car.make, 
+                           model=car.model, 
+                           year=car.year, 
+                           dealer=car.dealer)
         
         # Get primary image if available
         photo = None
@@ -286,7 +274,7 @@ async def car_details_handler(callback_query: CallbackQuery, state: FSMContext):
                 photo = img[0]  # image_url
                 break
         
-        logger.info(f"Generating car details keyboard for car ID: {car_id}")
+        logger.info("Generating car details keyboard for car ID: %s", car_id)
         
         # Build the car details keyboard
         details_keyboard = kb.car_details_keyboard(car_id)
@@ -312,7 +300,7 @@ async def car_details_handler(callback_query: CallbackQuery, state: FSMContext):
                     )
                 return
         except Exception as e:
-            logger.warning(f"Error during message cleanup: {e}")
+            logger.warning("Error during message cleanup: %s", e)
         
         # Show car details with photo if available
         if photo:
@@ -330,10 +318,9 @@ async def car_details_handler(callback_query: CallbackQuery, state: FSMContext):
                 reply_markup=details_keyboard
             )
         
-    except Exception as e:
-        logger.error(f"Error in car_details_handler: {e}", exc_info=True)
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+    except Exception:
+        logger.exception("Error in car_details_handler")
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while getting car details. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -345,24 +332,21 @@ async def direct_book_car_handler(callback_query: CallbackQuery, state: FSMConte
     """Direct handler for book car buttons - more reliable implementation"""
     try:
         # Log and acknowledge
-        logger.info(f"DIRECT book car handler triggered with data: {callback_query.data}")
+        logger.info("DIRECT book car handler triggered with data: %s", callback_query.data)
         await callback_query.answer("Processing booking request...")
         
         # Get car_id from callback data
         car_id = int(callback_query.data.split('_')[1])
-        logger.info(f"DIRECT booking car ID: {car_id}")
+        logger.info("DIRECT booking car ID: %s", car_id)
         
-        # Store in state
-        await state.update_data(car_id=car_id)
+        # Get language data
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # First check if the car exists and is available
-        car_details = db.get_car_details(car_id)
+        car_details = await run_db(db.get_car_details, car_id)
         if not car_details:
-            logger.warning(f"DIRECT: Car {car_id} not found or not available")
-            state_data = await state.get_data()
-            msgs = state_data.get('msgs', Messages('en'))
-            kb = KeyboardFactory(msgs)
-            
+            logger.warning("DIRECT: Car %s not found or not available", car_id)
             # Send error message
             await callback_query.message.reply(
                 msgs.get('car_not_found'),
@@ -370,11 +354,6 @@ async def direct_book_car_handler(callback_query: CallbackQuery, state: FSMConte
             )
             return
             
-        # Get language data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
         # Create date keyboard
         date_keyboard = kb.generate_date_keyboard(for_start=True)
         
@@ -383,31 +362,31 @@ async def direct_book_car_handler(callback_query: CallbackQuery, state: FSMConte
         try:
             await callback_query.message.delete()
         except Exception as e:
-            logger.warning(f"DIRECT: Could not delete message: {e}")
+            logger.warning("DIRECT: Could not delete message: %s", e)
             
         # Send a completely new message with date selection
         logger.info("DIRECT: Sending new date selection message")
         new_msg = await callback_query.message.answer(
-            "Please select the rental start date:",
+            msgs.get('select_start_date'),
             reply_markup=date_keyboard
         )
         
-        logger.info(f"DIRECT: New message sent with ID: {new_msg.message_id}")
+        logger.info("DIRECT: New message sent with ID: %s", new_msg.message_id)
         
-        # Set state
-        await state.set_state(CustomerStates.booking_select_start_date)
+        # Store car and set state
+        await set_state_and_data(state, CustomerStates.booking_select_start_date, car_id=car_id)
         logger.info("DIRECT: State set to booking_select_start_date")
         
-    except Exception as e:
-        logger.error(f"DIRECT ERROR in direct_book_car_handler: {e}", exc_info=True)
+    except Exception:
+        logger.exception("DIRECT ERROR in direct_book_car_handler")
         try:
             # Always try to send a new message in case of error
             await callback_query.message.reply(
                 "❌ An error occurred. Please try again.",
-                reply_markup=KeyboardFactory(Messages('en')).main_menu_keyboard()
+                reply_markup=get_keyboard_factory(get_messages('en')).main_menu_keyboard()
             )
         except Exception as final_e:
-            logger.error(f"Failed to send error message: {final_e}")
+            logger.error("Failed to send error message: %s", final_e)
             # Last resort
             await callback_query.answer("Error occurred. Please restart with /start")
 
@@ -417,13 +396,12 @@ async def my_booking_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle viewing user's active booking"""
     try:
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Get customer ID
         telegram_id = callback_query.from_user.id
-        customer_id = db.get_customer_id(telegram_id)
+        customer_id = await run_db(db.get_customer_id, telegram_id)
         
         if not customer_id:
             await send_or_edit_message(
@@ -434,7 +412,7 @@ async def my_booking_handler(callback_query: CallbackQuery, state: FSMContext):
             return
         
         # Get active booking
-        booking = db.get_active_booking(customer_id)
+        booking = await run_db(db.get_active_booking, customer_id)
         
         if not booking:
             await send_or_edit_message(
@@ -452,16 +430,15 @@ async def my_booking_handler(callback_query: CallbackQuery, state: FSMContext):
         await send_or_edit_message(
             callback_query,
             message,
-            reply_markup=kb.booking_details_keyboard(booking[0])  # booking[0] is booking_id
+            reply_markup=kb.booking_details_keyboard(booking.id)
         )
         
         # Set state to viewing booking
         await state.set_state(CustomerStates.viewing_booking)
         
     except Exception as e:
-        logger.error(f"Error in my_booking_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in my_booking_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while retrieving your booking. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -473,15 +450,14 @@ async def return_car_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle car return"""
     try:
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract booking_id from callback data
         booking_id = int(callback_query.data.split('_')[1])
         
         # Return the car
-        success, message = db.return_car(booking_id)
+        success, message = await run_db(db.return_car, booking_id)
         
         if success:
             await callback_query.answer(msgs.get('return_success'))
@@ -498,12 +474,11 @@ async def return_car_handler(callback_query: CallbackQuery, state: FSMContext):
             )
         
         # Clear state
-        await state.clear()
+        await reset_state(state)
         
     except Exception as e:
-        logger.error(f"Error in return_car_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in return_car_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while returning the car. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -515,9 +490,8 @@ async def back_to_menu_handler(callback_query: CallbackQuery, state: FSMContext)
     """Handle going back to main menu"""
     try:
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Show main menu
         await send_or_edit_message(
@@ -527,10 +501,10 @@ async def back_to_menu_handler(callback_query: CallbackQuery, state: FSMContext)
         )
         
         # Clear state
-        await state.clear()
+        await reset_state(state)
         
     except Exception as e:
-        logger.error(f"Error in back_to_menu_handler: {e}")
+        logger.error("Error in back_to_menu_handler: %s", e)
         await callback_query.message.answer(
             "❌ An error occurred. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -550,31 +524,27 @@ async def cancel_handler(message: Message, state: FSMContext):
             return
         
         # Clear state
-        await state.clear()
+        await reset_state(state)
         
         # Confirm cancellation
         await message.answer("✅ Operation cancelled. Send /start to begin again.")
         
     except Exception as e:
-        logger.error(f"Error in cancel_handler: {e}")
+        logger.error("Error in cancel_handler: %s", e)
         await message.answer("❌ An error occurred while cancelling. Please try again later.")
 
 
-@router.callback_query(lambda c: c.data.startswith("start_date_"))
+@router.callback_query(lambda c: c.data.startswith("start_date_") and c.data != "start_date_back")
 async def start_date_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle booking start date selection"""
     try:
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract date from callback data
         date_str = callback_query.data.replace("start_date_", "")
         
-        # Store date in state
-        await state.update_data(start_date=date_str)
-        
         # Notify user selection was received
         await callback_query.answer(f"Selected start date: {date_str}")
         
@@ -585,13 +555,12 @@ async def start_date_handler(callback_query: CallbackQuery, state: FSMContext):
             reply_markup=kb.generate_time_keyboard(for_start=True)
         )
         
-        # Set state to booking start time selection
-        await state.set_state(CustomerStates.booking_select_start_time)
+        # Store date and set state to booking start time selection
+        await set_state_and_data(state, CustomerStates.booking_select_start_time, start_date=date_str)
         
-    except Exception as e:
-        logger.error(f"Error in start_date_handler: {e}", exc_info=True)
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+    except Exception:
+        logger.exception("Error in start_date_handler")
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while selecting the date. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -604,8 +573,8 @@ async def start_time_handler(callback_query: CallbackQuery, state: FSMContext):
     try:
         # Get language configuration from state
         state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(state_data.get('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract time from callback data
         time_str = callback_query.data.replace("start_time_", "")
@@ -613,44 +582,41 @@ async def start_time_handler(callback_query: CallbackQuery, state: FSMContext):
         # Get state data
         start_date = state_data.get('start_date')
         
-        # Store complete start datetime
-        await state.update_data(start_time=time_str, start_datetime=f"{start_date} {time_str}")
-        
         # Ask for end date
         await send_or_edit_message(
             callback_query,
-            f"Please select the rental end date:",
+            msgs.get('select_end_date'),
             reply_markup=kb.generate_date_keyboard(for_start=False)
         )
         
-        # Set state to booking end date selection
-        await state.set_state(CustomerStates.booking_select_end_date)
+        # Store complete start datetime and set state to booking end date selection
+        await set_state_and_data(
+            state,
+            CustomerStates.booking_select_end_date,
+            start_time=time_str,
+            start_datetime=f"{start_date} {time_str}"
+        )
         
     except Exception as e:
-        logger.error(f"Error in start_time_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in start_time_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while selecting the time. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
         )
 
 
-@router.callback_query(lambda c: c.data.startswith("end_date_"))
+@router.callback_query(lambda c: c.data.startswith("end_date_") and c.data != "end_date_back")
 async def end_date_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle booking end date selection"""
     try:
         # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(await state.get_value('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract date from callback data
         date_str = callback_query.data.replace("end_date_", "")
         
-        # Store date in state
-        await state.update_data(end_date=date_str)
-        
         # Ask for end time
         await send_or_edit_message(
             callback_query,
@@ -658,13 +624,12 @@ async def end_date_handler(callback_query: CallbackQuery, state: FSMContext):
             reply_markup=kb.generate_time_keyboard(for_start=False)
         )
         
-        # Set state to booking end time selection
-        await state.set_state(CustomerStates.booking_select_end_time)
+        # Store date and set state to booking end time selection
+        await set_state_and_data(state, CustomerStates.booking_select_end_time, end_date=date_str)
         
     except Exception as e:
-        logger.error(f"Error in end_date_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in end_date_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while selecting the date. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -677,8 +642,8 @@ async def end_time_handler(callback_query: CallbackQuery, state: FSMContext):
     try:
         # Get language configuration from state
         state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(state_data.get('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract time from callback data
         time_str = callback_query.data.replace("end_time_", "")
@@ -690,10 +655,9 @@ async def end_time_handler(callback_query: CallbackQuery, state: FSMContext):
         
         # Store complete end datetime
         end_datetime = f"{end_date} {time_str}"
-        await state.update_data(end_time=time_str, end_datetime=end_datetime)
         
         # Get car details for confirmation
-        car_details = db.get_car_details(car_id)
+        car_details = await run_db(db.get_car_details, car_id)
         if not car_details:
             await send_or_edit_message(
                 callback_query,
@@ -708,7 +672,7 @@ async def end_time_handler(callback_query: CallbackQuery, state: FSMContext):
         confirmation_message = f"""
 📋 Please confirm your booking:
 
-🚗 {car[1]} {car[2]} ({car[3]})
+🚗 {car.make} {car.model} ({car.year})
 📅 From: {start_datetime}
 📅 To: {end_datetime}
 
@@ -727,13 +691,17 @@ Do you want to proceed with this booking?
             reply_markup=confirm_keyboard
         )
         
-        # Set state to confirming booking
-        await state.set_state(CustomerStates.confirming_booking)
+        # Store complete end datetime and set state to confirming booking
+        await set_state_and_data(
+            state,
+            CustomerStates.confirming_booking,
+            end_time=time_str,
+            end_datetime=end_datetime
+        )
         
     except Exception as e:
-        logger.error(f"Error in end_time_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in end_time_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while selecting the time. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
@@ -746,15 +714,15 @@ async def confirm_booking_handler(callback_query: CallbackQuery, state: FSMConte
     try:
         # Get language configuration from state
         state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        msgs = get_messages(state_data.get('language', 'en'))
+        kb = get_keyboard_factory(msgs)
         
         # Extract car_id from callback data
         car_id = int(callback_query.data.replace("confirm_booking_", ""))
         
         # Get customer ID
         telegram_id = callback_query.from_user.id
-        customer_id = db.get_customer_id(telegram_id)
+        customer_id = await run_db(db.get_customer_id, telegram_id)
         
         if not customer_id:
             await send_or_edit_message(
@@ -765,7 +733,7 @@ async def confirm_booking_handler(callback_query: CallbackQuery, state: FSMConte
             return
         
         # Book the car
-        success, result = db.book_car(customer_id, car_id)
+        success, result = await run_db(db.book_car, customer_id, car_id)
         
         if success:
             # Store booking data
@@ -789,141 +757,96 @@ async def confirm_booking_handler(callback_query: CallbackQuery, state: FSMConte
             )
         
         # Clear state
-        await state.clear()
+        await reset_state(state)
         
     except Exception as e:
-        logger.error(f"Error in confirm_booking_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        logger.error("Error in confirm_booking_handler: %s", e)
+        kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
         await callback_query.message.answer(
             "❌ An error occurred while confirming the booking. Please try again later.",
             reply_markup=kb.main_menu_keyboard()
         )
 
 
-@router.callback_query(lambda c: c.data == "change_language")
-async def change_language_handler(callback_query: CallbackQuery, state: FSMContext):
-    """Handle language change request"""
+async def _car_still_selected(state: FSMContext) -> bool:
+    """Check that the car being booked is still available"""
+    car_id = await state.get_value('car_id')
+    return bool(car_id and await run_db(db.get_car_details, car_id))
+
+
+class ScreenRoute(NamedTuple):
+    """Callback that shows a static screen and optionally switches state"""
+    text_key: str
+    keyboard: Callable[[KeyboardFactory], InlineKeyboardMarkup]
+    next_state: Optional[State] = None
+    precheck: Optional[Callable[[FSMContext], Awaitable[bool]]] = None
+    error_text: str = "❌ An error occurred. Please try again later."
+
+
+# Simple navigation callbacks, keyed by callback data
+SCREEN_ROUTES: Dict[str, ScreenRoute] = {
+    "change_language": ScreenRoute(
+        text_key='select_language',
+        keyboard=lambda kb: kb.language_keyboard(show_back_button=True),
+        next_state=CustomerStates.selecting_language,
+    ),
+    "contact_admin": ScreenRoute(
+        text_key='contact_admin_msg',
+        keyboard=lambda kb: kb.main_menu_keyboard(),
+    ),
+    "start_date_back": ScreenRoute(
+        text_key='select_start_date',
+        keyboard=lambda kb: kb.generate_date_keyboard(for_start=True),
+        next_state=CustomerStates.booking_select_start_date,
+        precheck=_car_still_selected,
+        error_text="❌ An error occurred. Going back to main menu.",
+    ),
+    "end_date_back": ScreenRoute(
+        text_key='select_end_date',
+        keyboard=lambda kb: kb.generate_date_keyboard(for_start=False),
+        next_state=CustomerStates.booking_select_end_date,
+        error_text="❌ An error occurred. Going back to main menu.",
+    ),
+}
+
+
+@router.callback_query(F.data.in_(SCREEN_ROUTES))
+async def screen_route_handler(callback_query: CallbackQuery, state: FSMContext):
+    """Handle language change, contact admin and back-to-date navigation"""
+    route = SCREEN_ROUTES[callback_query.data]
+    
+    # Clear the button spinner right away instead of after the message edit
+    spawn(callback_query.answer())
+    
+    kb = get_keyboard_factory(get_messages(await state.get_value('language', 'en')))
+    
     try:
-        # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Show language selection keyboard
-        await send_or_edit_message(
-            callback_query,
-            msgs.get('select_language'),
-            reply_markup=kb.language_keyboard(show_back_button=True)
-        )
-        
-        # Set state to selecting language
-        await state.set_state(CustomerStates.selecting_language)
-        
-    except Exception as e:
-        logger.error(f"Error in change_language_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred. Please try again later.",
-            reply_markup=kb.main_menu_keyboard()
-        )
-
-
-@router.callback_query(lambda c: c.data == "contact_admin")
-async def contact_admin_handler(callback_query: CallbackQuery, state: FSMContext):
-    """Handle contact admin request"""
-    try:
-        # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Show contact admin message
-        await send_or_edit_message(
-            callback_query,
-            msgs.get('contact_admin_msg'),
-            reply_markup=kb.main_menu_keyboard()
-        )
-        
-    except Exception as e:
-        logger.error(f"Error in contact_admin_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred. Please try again later.",
-            reply_markup=kb.main_menu_keyboard()
-        )
-
-
-@router.callback_query(lambda c: c.data == "start_date_back")
-async def start_date_back_handler(callback_query: CallbackQuery, state: FSMContext):
-    """Handle going back from time selection to date selection"""
-    try:
-        # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Get car_id from state
-        car_id = state_data.get('car_id')
-        
-        if not car_id:
-            # If car_id is missing, go back to list
-            await back_to_car_list_handler(callback_query, state)
+        # Repeated presses on a screen that is already shown would only produce
+        # a "message is not modified" edit, so skip the round trip
+        text = kb.msgs.get(route.text_key)
+        if (route.next_state is not None
+                and await state.get_state() == route.next_state.state
+                and callback_query.message
+                and callback_query.message.text == text):
             return
         
-        # Get car details again
-        car_details = db.get_car_details(car_id)
-        if not car_details:
-            await callback_query.answer("❌ Car no longer available")
+        # Fall back to the car list if the booking can no longer continue
+        if route.precheck and not await route.precheck(state):
             await back_to_car_list_handler(callback_query, state)
             return
         
-        # Show date selection again
         await send_or_edit_message(
             callback_query,
-            "Please select the rental start date:",
-            reply_markup=kb.generate_date_keyboard(for_start=True)
+            text,
+            reply_markup=route.keyboard(kb)
         )
         
-        # Set state back to start date selection
-        await state.set_state(CustomerStates.booking_select_start_date)
+        if route.next_state is not None:
+            await state.set_state(route.next_state)
         
-    except Exception as e:
-        logger.error(f"Error in start_date_back_handler: {e}", exc_info=True)
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+    except Exception:
+        logger.exception("Error in screen_route_handler (%s)", callback_query.data)
         await callback_query.message.answer(
-            "❌ An error occurred. Going back to main menu.",
+            route.error_text,
             reply_markup=kb.main_menu_keyboard()
         )
-
-
-@router.callback_query(lambda c: c.data == "end_date_back")
-async def end_date_back_handler(callback_query: CallbackQuery, state: FSMContext):
-    """Handle going back from end time selection to end date selection"""
-    try:
-        # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Show end date selection again
-        await send_or_edit_message(
-            callback_query,
-            "Please select the rental end date:",
-            reply_markup=kb.generate_date_keyboard(for_start=False)
-        )
-        
-        # Set state back to end date selection
-        await state.set_state(CustomerStates.booking_select_end_date)
-        
-    except Exception as e:
-        logger.error(f"Error in end_date_back_handler: {e}", exc_info=True)
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred. Going back to main menu.",
-            reply_markup=kb.main_menu_keyboard()
-        ) 
\ No newline at end of file
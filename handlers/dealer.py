@@ -1,6 +1,13 @@
+import asyncio
 import logging
-from aiogram import F, Router
+import re
+import time
+import weakref
+from functools import wraps
+from typing import Dict, Optional, Tuple
+from aiogram import BaseMiddleware, F, Router
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -8,12 +15,17 @@ from datetime import datetime
 
 import db
 from config.config import ADMIN_GROUP_ID, logger
-from utils.helpers import send_or_edit_message, is_admin_group
-from utils.keyboards import KeyboardFactory
-from messages import Messages
+from utils.helpers import send_or_edit_message, spawn
+from utils.logger import log_critical_error
+from utils.keyboards import get_keyboard_factory
+from utils.db_async import run_db
+from utils.storage import set_state_and_data
+from messages import get_messages
 
-# Create a router for dealer handlers
+# Create a router for dealer handlers; dealer actions only work in the admin group
 router = Router()
+router.message.filter(F.chat.id == ADMIN_GROUP_ID)
+router.callback_query.filter(F.message.chat.id == ADMIN_GROUP_ID)
 
 # States for dealer interactions
 class DealerStates(StatesGroup):
@@ -26,348 +38,359 @@ class DealerStates(StatesGroup):
     viewing_stats = State()
     refreshing_car_photo = State()
 
-def is_dealer(user_id: int) -> bool:
-    """Check if user is a registered dealer"""
-    try:
-        return db.is_dealer(user_id)
-    except Exception as e:
-        logger.error(f"Error checking dealer status: {e}")
-        return False
+# The dealer panel is English-only, so its keyboards are built once
+_EN_KB = get_keyboard_factory(get_messages('en'))
+_DEALER_MENU = _EN_KB.dealer_menu_keyboard()
+
+# Fixed dealer keyboard rows and markups, shared by every update
+_ADD_CAR_ROW = [InlineKeyboardButton(text="➕ Add Car", callback_data="dealer_add_car")]
+_BACK_ROW = [InlineKeyboardButton(text="🔙 Back", callback_data="dealer_back")]
+_CANCEL_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Cancel", callback_data="dealer_back")]
+])
+_BACK_KB = InlineKeyboardMarkup(inline_keyboard=[_BACK_ROW])
+_EMPTY_INVENTORY_KB = InlineKeyboardMarkup(inline_keyboard=[_ADD_CAR_ROW, _BACK_ROW])
+_CANCEL_DELETE_BUTTON = InlineKeyboardButton(text="❌ No, cancel", callback_data="dealer_my_cars")
+
+# Car make: letters (any script) and whitespace only
+_MAKE_RE = re.compile(r"(?:[^\W\d_]|\s)+")
+
+# Latest accepted model year; only recomputed when a year fails the check
+_max_year = datetime.now().year + 1
+
+def _is_valid_year(year: int) -> bool:
+    """Check that a model year is between 1900 and next year"""
+    global _max_year
+    if 1900 <= year <= _max_year:
+        return True
+    
+    # The cached bound may be stale after New Year
+    _max_year = datetime.now().year + 1
+    return 1900 <= year <= _max_year
+
+# Cache of Telegram user ID -> (dealer ID or None, expiry time)
+_DEALER_TTL = 300
+_DEALER_NEGATIVE_TTL = 30
+_dealer_cache: Dict[int, Tuple[Optional[int], float]] = {}
+
+async def resolve_dealer(user_id: int) -> Optional[int]:
+    """Get the dealer ID for a Telegram user, or None if they are not a dealer
+    
+    Results are cached for a few minutes; "not a dealer" answers expire sooner
+    so a newly added dealer is picked up quickly.
+    """
+    now = time.monotonic()
+    cached = _dealer_cache.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
+    dealer_id = await run_db(db.get_dealer_id, user_id)
+    ttl = _DEALER_TTL if dealer_id else _DEALER_NEGATIVE_TTL
+    _dealer_cache[user_id] = (dealer_id, now + ttl)
+    return dealer_id
+
+def invalidate_dealer_cache(user_id: Optional[int] = None) -> None:
+    """Drop the cached dealer lookup for a user, or for everyone if no user is given"""
+    if user_id is None:
+        _dealer_cache.clear()
+    else:
+        _dealer_cache.pop(user_id, None)
+
+# Cache of car ID -> (owning dealer ID, car text, photo, expiry time) for car views
+_CAR_VIEW_TTL = 30
+_car_view_cache: Dict[int, Tuple[int, str, Optional[str], float]] = {}
+
+def _get_car_view(car_id: int, dealer_id: int, now: float) -> Optional[Tuple[str, Optional[str]]]:
+    """Get a dealer's unexpired cached car view as (car text, photo), dropping it if expired"""
+    cached = _car_view_cache.get(car_id)
+    if cached is None:
+        return None
+    if cached[3] <= now:
+        del _car_view_cache[car_id]
+        return None
+    return (cached[1], cached[2]) if cached[0] == dealer_id else None
+
+def _cache_car_view(car_id: int, dealer_id: int, car_info: str, photo: Optional[str], now: float) -> None:
+    """Cache a rendered car view"""
+    _car_view_cache[car_id] = (dealer_id, car_info, photo, now + _CAR_VIEW_TTL)
+    
+    # Sweep expired entries now and then so views of cars that are never
+    # opened again do not pile up
+    if len(_car_view_cache) % 128 == 0:
+        for stale in [k for k, v in _car_view_cache.items() if v[3] <= now]:
+            del _car_view_cache[stale]
+
+def invalidate_car_view(car_id: int) -> None:
+    """Drop the cached view of a car after it changes"""
+    _car_view_cache.pop(car_id, None)
+
+class DealerErrorMiddleware(BaseMiddleware):
+    """Log errors from dealer handlers and reply with the dealer menu
+    
+    The dealer's state is cleared as well, so a failed step does not leave
+    them stuck in the middle of a flow. Telegram API errors, flood control
+    included, are left to the dispatcher's ErrorHandlingMiddleware.
+    """
+    async def __call__(self, handler, event, data):
+        try:
+            return await handler(event, data)
+        except TelegramAPIError:
+            raise
+        except Exception as e:
+            handler_object = data.get('handler')
+            name = handler_object.callback.__name__ if handler_object else "dealer handler"
+            # Formatting the traceback is costly; only do it when debugging
+            logger.error("Error in %s: %s", name, e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            log_critical_error("Unexpected Error", e)
+            
+            state = data.get('state')
+            if state:
+                await state.clear()
+            
+            target = event.message if isinstance(event, CallbackQuery) else event
+            try:
+                await target.answer(
+                    "❌ An error occurred. Please try again later.",
+                    reply_markup=_DEALER_MENU
+                )
+            except Exception as notify_error:
+                logger.error("Failed to notify dealer about error: %s", notify_error)
+
+class DealerAuthMiddleware(BaseMiddleware):
+    """Let only registered dealers reach dealer handlers
+    
+    The router's chat filter has already limited updates to the admin group.
+    The caller's dealer ID is passed to handlers as ``dealer_id``.
+    """
+    async def __call__(self, handler, event, data):
+        dealer_id = await resolve_dealer(event.from_user.id)
+        if not dealer_id:
+            await event.answer("❌ You are not registered as a dealer.")
+            return
+        
+        data['dealer_id'] = dealer_id
+        return await handler(event, data)
+
+# Error handling wraps the auth check so failed dealer lookups are reported too
+router.message.middleware(DealerErrorMiddleware())
+router.callback_query.middleware(DealerErrorMiddleware())
+router.message.middleware(DealerAuthMiddleware())
+router.callback_query.middleware(DealerAuthMiddleware())
+
+# Last time each (user ID, action) ran, to drop double clicks on destructive actions
+_IDEMPOTENCY_TTL = 2.0
+_recent_actions: Dict[Tuple[int, str], float] = {}
+
+def _is_repeat_action(user_id: int, action: str) -> bool:
+    """Record an action and report whether the same user just ran it"""
+    now = time.monotonic()
+    key = (user_id, action)
+    if now - _recent_actions.get(key, float('-inf')) < _IDEMPOTENCY_TTL:
+        return True
+    _recent_actions[key] = now
+    
+    # Sweep expired entries now and then so the dict stays small
+    if len(_recent_actions) % 128 == 0:
+        for stale in [k for k, t in _recent_actions.items() if now - t >= _IDEMPOTENCY_TTL]:
+            del _recent_actions[stale]
+    return False
+
+def _forget_action(user_id: int, action: str) -> None:
+    """Forget a failed action so the user can retry it straight away"""
+    _recent_actions.pop((user_id, action), None)
+
+# Limit on concurrent heavy dealer updates, plus one lock per user so a
+# user's own updates are handled in order. Polling already runs every update
+# as its own task, so these only bound and order the work.
+_dispatch_sem = asyncio.Semaphore(16)
+_user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def per_user_serialized(handler):
+    """Run a handler under its user's lock and the shared concurrency limit"""
+    @wraps(handler)
+    async def wrapper(event, *args, **kwargs):
+        lock = _user_locks.get(event.from_user.id)
+        if lock is None:
+            lock = _user_locks[event.from_user.id] = asyncio.Lock()
+        async with lock, _dispatch_sem:
+            return await handler(event, *args, **kwargs)
+    return wrapper
 
 # Dealer command - only works for registered dealers in admin group
 @router.message(Command("dealer"))
 async def dealer_command_handler(message: Message, state: FSMContext):
     """Handle /dealer command in admin group for dealers"""
-    if not is_admin_group(message):
-        await message.answer("❌ This command is only available in the admin group.")
-        return
-        
-    try:
-        user_id = message.from_user.id
-        
-        # Check if user is a dealer
-        if not is_dealer(user_id):
-            await message.answer("❌ You are not registered as a dealer. Please contact the administrator.")
-            return
-        
-        # Set language to English for dealer panel
-        msgs = Messages('en')
-        kb = KeyboardFactory(msgs)
-        
-        # Store in state for use in other handlers
-        await state.update_data(language='en', msgs=msgs)
-        
-        # Show dealer menu
-        await message.answer(
-            "🚗 Dealer Panel",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
-        
-    except Exception as e:
-        logger.error(f"Error in dealer_command_handler: {e}")
-        await message.answer("❌ An error occurred. Please try again later.")
+    # Set language to English for dealer panel
+    # Store in state for use in other handlers
+    await state.update_data(language='en')
+    
+    # Show dealer menu
+    await message.answer(
+        "🚗 Dealer Panel",
+        reply_markup=_DEALER_MENU
+    )
 
 # Dealer callbacks
-@router.callback_query(lambda c: c.data.startswith("dealer_"))
-async def dealer_callback_handler(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("dealer_"))
+@per_user_serialized
+async def dealer_callback_handler(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
     """Handle dealer menu callbacks"""
-    if not is_admin_group(callback_query.message):
-        await callback_query.answer("❌ This action is only available in the admin group.")
-        return
-        
-    try:
-        user_id = callback_query.from_user.id
-        
-        # Check if user is a dealer
-        if not is_dealer(user_id):
-            await callback_query.answer("❌ You are not registered as a dealer.")
-            return
-        
-        # Get language configuration from state or create new
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-            
-        action = callback_query.data.replace("dealer_", "")
-        
-        if action == "add_car":
-            await start_add_car(callback_query, state, kb)
-        elif action == "my_cars":
-            await show_dealer_cars(callback_query, state, kb)
-        elif action == "stats":
-            await show_dealer_stats(callback_query, state, kb)
-        elif action == "back":
-            await back_to_dealer_menu(callback_query, state, kb)
-        else:
-            await callback_query.answer("Unknown action")
-            
-    except Exception as e:
-        logger.error(f"Error in dealer_callback_handler: {e}")
-        await callback_query.message.answer("❌ An error occurred. Please try again later.")
+    # Clear the button spinner right away instead of after the message edit
+    spawn(callback_query.answer())
+    
+    action = callback_query.data.replace("dealer_", "")
+    
+    if action == "add_car":
+        await start_add_car(callback_query, state)
+    elif action == "my_cars":
+        await show_dealer_cars(callback_query, state, dealer_id)
+    elif action == "stats":
+        await show_dealer_stats(callback_query, state, dealer_id)
+    elif action == "back":
+        await back_to_dealer_menu(callback_query, state)
+    else:
+        logger.warning("Unknown dealer action: %s", action)
 
-@router.callback_query(lambda c: c.data == "dealer_back")
+@router.callback_query(F.data == "dealer_back")
 async def dealer_back_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle dealer back button"""
-    try:
-        # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Call back_to_dealer_menu function
-        await back_to_dealer_menu(callback_query, state, kb)
-        
-    except Exception as e:
-        logger.error(f"Error in dealer_back_handler: {e}")
-        await callback_query.message.answer(
-            "❌ An error occurred. Please try again later.",
-            reply_markup=KeyboardFactory(Messages('en')).dealer_menu_keyboard()
-        )
+    # Clear the button spinner right away instead of after the message edit
+    spawn(callback_query.answer())
+    
+    # Call back_to_dealer_menu function
+    await back_to_dealer_menu(callback_query, state)
 
-@router.callback_query(lambda c: c.data == "dealer_my_cars")
-async def dealer_my_cars_handler(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data == "dealer_my_cars")
+async def dealer_my_cars_handler(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
     """Handle dealer my cars button"""
-    try:
-        # Get language configuration from state
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Call show_dealer_cars function
-        await show_dealer_cars(callback_query, state, kb)
-        
-    except Exception as e:
-        logger.error(f"Error in dealer_my_cars_handler: {e}")
-        await callback_query.message.answer(
-            "❌ An error occurred. Please try again later.",
-            reply_markup=KeyboardFactory(Messages('en')).dealer_menu_keyboard()
-        )
+    # Clear the button spinner right away instead of after the message edit
+    spawn(callback_query.answer())
+    
+    # Call show_dealer_cars function
+    await show_dealer_cars(callback_query, state, dealer_id)
 
-async def start_add_car(callback_query: CallbackQuery, state: FSMContext, kb):
+async def start_add_car(callback_query: CallbackQuery, state: FSMContext):
     """Start the process of adding a car"""
-    try:
-        # Ask for car make
-        await send_or_edit_message(
-            callback_query,
-            "Please enter the car make (e.g., Toyota, Honda):",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Cancel", callback_data="dealer_back")]
-            ])
-        )
-        
-        # Set state to adding car make
-        await state.set_state(DealerStates.adding_car)
-        
-    except Exception as e:
-        logger.error(f"Error in start_add_car: {e}")
-        await callback_query.message.answer(
-            "❌ An error occurred while preparing to add a car.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
+    # Ask for car make
+    await send_or_edit_message(
+        callback_query,
+        "Please enter the car make (e.g., Toyota, Honda):",
+        reply_markup=_CANCEL_KB
+    )
+    
+    # Set state to adding car make
+    await state.set_state(DealerStates.adding_car)
 
 @router.message(DealerStates.adding_car)
 async def dealer_add_car_make_handler(message: Message, state: FSMContext):
     """Handle dealer adding car make"""
-    if not is_admin_group(message):
-        await message.answer("❌ This action is only available in the admin group.")
+    make = message.text.strip()
+    
+    # Input validation for make
+    if not make or len(make) < 1 or len(make) > 50:
+        await message.answer("❌ Invalid car make. Please enter a make between 1 and 50 characters.")
         return
         
-    if not is_dealer(message.from_user.id):
-        await message.answer("❌ You are not registered as a dealer.")
+    # Validate that the make contains only letters and spaces
+    if not _MAKE_RE.fullmatch(make):
+        await message.answer("❌ Car make should contain only letters and spaces.")
         return
-        
-    try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        make = message.text.strip()
-        
-        # Input validation for make
-        if not make or len(make) < 1 or len(make) > 50:
-            await message.answer("❌ Invalid car make. Please enter a make between 1 and 50 characters.")
-            return
-            
-        # Validate that the make contains only letters and spaces
-        if not all(c.isalpha() or c.isspace() for c in make):
-            await message.answer("❌ Car make should contain only letters and spaces.")
-            return
-        
-        await state.update_data(car_make=make)
-        
-        # Ask for car model
-        await state.set_state(DealerStates.adding_car_model)
-        await message.answer(f"Great! Now please enter the model of the {make}:")
-        
-    except Exception as e:
-        logger.error(f"Error in dealer_add_car_make_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await message.answer(
-            "❌ An error occurred while processing the car make.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
+    
+    await state.update_data(car_make=make)
+    
+    # Ask for car model
+    await state.set_state(DealerStates.adding_car_model)
+    await message.answer(f"Great! Now please enter the model of the {make}:")
 
 @router.message(DealerStates.adding_car_model)
 async def dealer_add_car_model_handler(message: Message, state: FSMContext):
     """Handle dealer adding car model"""
-    if not is_admin_group(message):
-        await message.answer("❌ This action is only available in the admin group.")
+    model = message.text.strip()
+    
+    # Input validation for model
+    if not model or len(model) < 1 or len(model) > 50:
+        await message.answer("❌ Invalid model name. Please enter a model name between 1 and 50 characters.")
         return
-        
-    if not is_dealer(message.from_user.id):
-        await message.answer("❌ You are not registered as a dealer.")
-        return
-        
-    try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        model = message.text.strip()
-        
-        # Input validation for model
-        if not model or len(model) < 1 or len(model) > 50:
-            await message.answer("❌ Invalid model name. Please enter a model name between 1 and 50 characters.")
-            return
-        
-        # Get data from state
-        data = await state.get_data()
-        make = data.get('car_make')
-        
-        await state.update_data(car_model=model)
-        
-        # Ask for car year
-        await state.set_state(DealerStates.adding_car_year)
-        await message.answer(f"Great! Now please enter the year of the {make} {model} (e.g., 2022):")
-        
-    except Exception as e:
-        logger.error(f"Error in dealer_add_car_model_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await message.answer(
-            "❌ An error occurred while processing the car model.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
+    
+    # Get make from state
+    make = await state.get_value('car_make')
+    
+    # Store model and ask for car year
+    await set_state_and_data(state, DealerStates.adding_car_year, car_model=model)
+    await message.answer(f"Great! Now please enter the year of the {make} {model} (e.g., 2022):")
 
 @router.message(DealerStates.adding_car_year)
 async def dealer_add_car_year_handler(message: Message, state: FSMContext):
     """Handle dealer adding car year"""
-    if not is_admin_group(message):
-        await message.answer("❌ This action is only available in the admin group.")
-        return
-        
-    if not is_dealer(message.from_user.id):
-        await message.answer("❌ You are not registered as a dealer.")
-        return
-        
+    year_text = message.text.strip()
+    
+    # Input validation for year
     try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
+        year = int(year_text)
         
-        year_text = message.text.strip()
-        
-        # Input validation for year
-        try:
-            year = int(year_text)
-            current_year = datetime.now().year
-            
-            # Check if year is reasonable (between 1900 and current year + 1)
-            if year < 1900 or year > current_year + 1:
-                await message.answer(f"❌ Invalid year. Please enter a year between 1900 and {current_year + 1}.")
-                return
-                
-        except ValueError:
-            await message.answer("❌ Please enter a valid year (numbers only).")
+        # Check if year is reasonable (between 1900 and current year + 1)
+        if not _is_valid_year(year):
+            await message.answer(f"❌ Invalid year. Please enter a year between 1900 and {_max_year}.")
             return
-        
-        # Get data from state
-        data = await state.get_data()
-        make = data.get('car_make')
-        model = data.get('car_model')
-        
-        await state.update_data(car_year=year)
-        
-        # Ask for car photo
-        await state.set_state(DealerStates.adding_car_photo)
-        await message.answer(f"Great! Now please send a photo of the {make} {model} ({year}).")
-        
-    except Exception as e:
-        logger.error(f"Error in dealer_add_car_year_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await message.answer(
-            "❌ An error occurred while processing the car year.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
+            
+    except ValueError:
+        await message.answer("❌ Please enter a valid year (numbers only).")
+        return
+    
+    # Get data from state
+    data = await state.get_data()
+    make = data.get('car_make')
+    model = data.get('car_model')
+    
+    # Store year and ask for car photo
+    await set_state_and_data(state, DealerStates.adding_car_photo, car_year=year)
+    await message.answer(f"Great! Now please send a photo of the {make} {model} ({year}).")
 
 @router.message(DealerStates.adding_car_photo, F.photo)
-async def dealer_add_car_photo_handler(message: Message, state: FSMContext):
+@per_user_serialized
+async def dealer_add_car_photo_handler(message: Message, state: FSMContext, dealer_id: int):
     """Handle dealer adding car photo"""
-    if not is_admin_group(message):
-        await message.answer("❌ This action is only available in the admin group.")
-        return
-        
-    if not is_dealer(message.from_user.id):
-        await message.answer("❌ You are not registered as a dealer.")
+    # A second photo sent right away would add the car twice
+    if _is_repeat_action(message.from_user.id, "add_car_photo"):
+        await message.answer("⏳ Already processing...")
         return
-        
+    
+    # Get photo file ID (largest size)
+    photo_id = message.photo[-1].file_id
+    
+    # Get data from state
+    data = await state.get_data()
+    make = data.get('car_make')
+    model = data.get('car_model')
+    year = data.get('car_year')
+    
+    # Add car to database
     try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Get photo file ID (largest size)
-        photo_id = message.photo[-1].file_id
-        
-        # Get data from state
-        data = await state.get_data()
-        make = data.get('car_make')
-        model = data.get('car_model')
-        year = data.get('car_year')
-        
-        # Get dealer ID from user ID
-        dealer_id = db.get_dealer_id(message.from_user.id)
+        success, result = await run_db(db.add_dealer_car, dealer_id, make, model, year, photo_id)
+    except Exception:
+        _forget_action(message.from_user.id, "add_car_photo")
+        raise
+    
+    if success:
+        # Show success message
+        await message.answer(
+            f"✅ Car added successfully!\n\n"
+            f"Make: {make}\n"
+            f"Model: {model}\n"
+            f"Year: {year}",
+            reply_markup=_DEALER_MENU
+        )
         
-        if not dealer_id:
-            await message.answer("❌ You are not registered as a dealer.")
-            await state.clear()
-            return
-            
-        # Add car to database
-        success, result = db.add_dealer_car(dealer_id, make, model, year, photo_id)
+        # Clear state
+        await state.clear()
+    else:
+        # Let the dealer retry straight away
+        _forget_action(message.from_user.id, "add_car_photo")
         
-        if success:
-            # Show success message
-            await message.answer(
-                f"✅ Car added successfully!\n\n"
-                f"Make: {make}\n"
-                f"Model: {model}\n"
-                f"Year: {year}",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            
-            # Clear state
-            await state.clear()
-        else:
-            # Show error message
-            await message.answer(
-                f"❌ Failed to add car: {result}",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            
-    except Exception as e:
-        logger.error(f"Error in dealer_add_car_photo_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+        # Show error message
         await message.answer(
-            "❌ An error occurred while processing the car photo.",
-            reply_markup=kb.dealer_menu_keyboard()
+            f"❌ Failed to add car: {result}",
+            reply_markup=_DEALER_MENU
         )
 
 @router.message(DealerStates.adding_car_photo)
@@ -375,466 +398,293 @@ async def dealer_add_car_photo_text_handler(message: Message, state: FSMContext)
     """Handle text instead of photo"""
     await message.answer("❌ Please send a photo of the car. Text messages are not accepted here.")
 
-@router.callback_query(lambda c: c.data.startswith("refresh_car_image_"))
-async def refresh_car_image_handler(callback_query: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("refresh_car_image_"))
+async def refresh_car_image_handler(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
     """Handle refreshing a car's image when it becomes invalid"""
-    if not is_admin_group(callback_query.message):
-        await callback_query.answer("❌ This action is only available in the admin group.")
+    # Extract car_id from callback data
+    car_id = int(callback_query.data.split('_')[-1])
+    
+    # Verify the car belongs to this dealer
+    if not await run_db(db.dealer_owns_car, dealer_id, car_id):
+        await callback_query.answer("❌ This car doesn't belong to you.")
         return
-        
-    if not is_dealer(callback_query.from_user.id):
-        await callback_query.answer("❌ You are not registered as a dealer.")
-        return
-        
-    try:
-        # Extract car_id from callback data
-        car_id = int(callback_query.data.split('_')[-1])
-        
-        # Get dealer ID from user ID
-        dealer_id = db.get_dealer_id(callback_query.from_user.id)
-        
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Verify the car belongs to this dealer
-        cars = db.get_dealer_cars(dealer_id)
-        car_ids = [car[0] for car in cars]
-        
-        if car_id not in car_ids:
-            await callback_query.answer("❌ This car doesn't belong to you.")
-            return
-            
-        # Ask user to upload a new photo
-        await callback_query.message.answer(
-            "Please upload a new photo for this car. The current image file ID is invalid.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
-        
-        # Store car_id in state
-        await state.update_data(refresh_car_id=car_id)
-        
-        # Set state to refreshing car photo
-        await state.set_state(DealerStates.refreshing_car_photo)
-        
-    except Exception as e:
-        logger.error(f"Error in refresh_car_image_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred while preparing to refresh car image.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
+    
+    # Ownership is confirmed; stop the spinner before sending the prompt
+    spawn(callback_query.answer())
+        
+    # Ask user to upload a new photo
+    await callback_query.message.answer(
+        "Please upload a new photo for this car. The current image file ID is invalid.",
+        reply_markup=_DEALER_MENU
+    )
+    
+    # Store car_id in state
+    await state.update_data(refresh_car_id=car_id)
+    
+    # Set state to refreshing car photo
+    await state.set_state(DealerStates.refreshing_car_photo)
 
 @router.message(DealerStates.refreshing_car_photo, F.photo)
+@per_user_serialized
 async def process_refreshed_car_photo(message: Message, state: FSMContext):
     """Process the refreshed car photo"""
-    if not is_admin_group(message):
-        await message.answer("❌ This action is only available in the admin group.")
-        return
-        
-    if not is_dealer(message.from_user.id):
-        await message.answer("❌ You are not registered as a dealer.")
+    # Get state data
+    state_data = await state.get_data()
+    
+    # Get car_id from state
+    car_id = state_data.get('refresh_car_id')
+    
+    if not car_id:
+        await message.answer(
+            "❌ Car ID not found in state. Please try again.",
+            reply_markup=_DEALER_MENU
+        )
+        await state.clear()
         return
         
-    try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Get car_id from state
-        car_id = state_data.get('refresh_car_id')
-        
-        if not car_id:
-            await message.answer(
-                "❌ Car ID not found in state. Please try again.",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            await state.clear()
-            return
-            
-        # Get photo file ID (largest size)
-        photo_id = message.photo[-1].file_id
-        
-        # Update car image in database
-        success, result = db.refresh_car_image(car_id, photo_id)
-        
-        if success:
-            await message.answer(
-                f"✅ Car image updated successfully!\n\n{result}",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-        else:
-            await message.answer(
-                f"❌ Failed to update car image: {result}",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            
-        # Clear state
-        await state.clear()
-            
-    except Exception as e:
-        logger.error(f"Error in process_refreshed_car_photo: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
+    # Get photo file ID (largest size)
+    photo_id = message.photo[-1].file_id
+    
+    # Update car image in database
+    success, result = await run_db(db.refresh_car_image, car_id, photo_id)
+    
+    if success:
+        invalidate_car_view(car_id)
         await message.answer(
-            "❌ An error occurred while processing the refreshed car photo.",
-            reply_markup=kb.dealer_menu_keyboard()
+            f"✅ Car image updated successfully!\n\n{result}",
+            reply_markup=_DEALER_MENU
         )
-        await state.clear()
+    else:
+        await message.answer(
+            f"❌ Failed to update car image: {result}",
+            reply_markup=_DEALER_MENU
+        )
+        
+    # Clear state
+    await state.clear()
 
-async def show_dealer_cars(callback_query: CallbackQuery, state: FSMContext, kb):
+@router.message(DealerStates.refreshing_car_photo)
+async def refreshed_car_photo_text_handler(message: Message, state: FSMContext):
+    """Handle text instead of a refreshed photo"""
+    await message.answer("❌ Please send a new photo of the car. Text messages are not accepted here.")
+
+async def show_dealer_cars(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
     """Show dealer's cars"""
-    try:
-        # Get dealer ID from user ID
-        dealer_id = db.get_dealer_id(callback_query.from_user.id)
-        
-        if not dealer_id:
-            await callback_query.answer("❌ You are not registered as a dealer.")
-            return
-            
-        # Get cars from database
-        cars = db.get_dealer_cars(dealer_id)
-        
-        if not cars or len(cars) == 0:
-            # No cars found, show message with option to add one
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="➕ Add Car", callback_data="dealer_add_car")],
-                [InlineKeyboardButton(text="🔙 Back", callback_data="dealer_back")]
-            ])
-            
-            await send_or_edit_message(
-                callback_query,
-                "You have no cars in your inventory. You can add a new car.",
-                reply_markup=keyboard
-            )
-            return
-            
-        # Create response text
-        text = "🚗 Your Cars:\n\n"
-        
-        # Create keyboard with car actions
-        keyboard = []
-        
-        for car in cars:
-            car_id = car[0]
-            make = car[1]
-            model = car[2]
-            year = car[3]
-            available = "✅ Available" if car[4] else "❌ Booked"
-            
-            text += f"🔹 {make} {model} ({year})\n"
-            text += f"Status: {available}\n\n"
-            
-            # Add view/delete buttons for this car
-            keyboard.append([
-                InlineKeyboardButton(
-                    text=f"👁️ View {make} {model}",
-                    callback_data=f"view_dealer_car_{car_id}"
-                )
-            ])
-            keyboard.append([
-                InlineKeyboardButton(
-                    text=f"🗑️ Delete {make} {model}",
-                    callback_data=f"delete_dealer_car_{car_id}"
-                )
-            ])
-        
-        # Add add car button
-        keyboard.append([
-            InlineKeyboardButton(text="➕ Add Car", callback_data="dealer_add_car")
-        ])
-        
-        # Add back button
-        keyboard.append([
-            InlineKeyboardButton(text="🔙 Back", callback_data="dealer_back")
-        ])
-        
-        # Send message with car list
+    # Get cars from database
+    cars = await run_db(db.get_dealer_cars, dealer_id)
+    
+    if not cars or len(cars) == 0:
+        # No cars found, show message with option to add one
         await send_or_edit_message(
             callback_query,
-            text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+            "You have no cars in your inventory. You can add a new car.",
+            reply_markup=_EMPTY_INVENTORY_KB
         )
+        return
         
-        # Set state to viewing cars
-        await state.set_state(DealerStates.viewing_cars)
-        
-    except Exception as e:
-        logger.error(f"Error in show_dealer_cars: {e}")
-        await callback_query.message.answer(
-            "❌ An error occurred while retrieving your cars.",
-            reply_markup=kb.dealer_menu_keyboard()
+    # Create response text
+    text = "🚗 Your Cars:\n\n" + "".join(
+        f"🔹 {car.make} {car.model} ({car.year})\n"
+        f"Status: {'✅ Available' if car.available else '❌ Booked'}\n\n"
+        for car in cars
+    )
+    
+    # Create keyboard with view/delete buttons for each car
+    keyboard = [
+        row
+        for car in cars
+        for row in (
+            [InlineKeyboardButton(text=f"👁️ View {car.make} {car.model}", callback_data=f"view_dealer_car_{car.id}")],
+            [InlineKeyboardButton(text=f"🗑️ Delete {car.make} {car.model}", callback_data=f"delete_dealer_car_{car.id}")]
         )
+    ]
+    
+    # Add add car and back buttons
+    keyboard.append(_ADD_CAR_ROW)
+    keyboard.append(_BACK_ROW)
+    
+    # Send message with car list
+    await send_or_edit_message(
+        callback_query,
+        text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+    )
+    
+    # Keep the listed cars so viewing one of them soon after needs no database query.
+    # Keys and rows are plain strings and lists so the data stays JSON-serializable;
+    # the wall-clock time works across workers sharing Redis.
+    cars_by_id = {str(car.id): list(car) for car in cars}
+    await set_state_and_data(
+        state, DealerStates.viewing_cars, cars_by_id=cars_by_id, cars_listed_at=time.time()
+    )
 
-async def show_dealer_stats(callback_query: CallbackQuery, state: FSMContext, kb):
+async def show_dealer_stats(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
     """Show dealer's booking statistics"""
-    try:
-        # Get dealer ID from user ID
-        dealer_id = db.get_dealer_id(callback_query.from_user.id)
-        
-        if not dealer_id:
-            await callback_query.answer("❌ You are not registered as a dealer.")
-            return
-            
-        # Get stats from database
-        stats = db.get_dealer_stats(dealer_id)
-        
-        if not stats:
-            await send_or_edit_message(
-                callback_query,
-                "No statistics available. You may not have any bookings yet.",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            return
-            
-        # Create response text
-        text = "📊 Your Booking Statistics:\n\n"
-        
-        # Add stats to text
-        text += f"🚗 Total Cars: {stats['total_cars']}\n"
-        text += f"📋 Total Bookings: {stats['total_bookings']}\n"
-        text += f"✅ Active Bookings: {stats['active_bookings']}\n"
-        text += f"🔄 Completed Bookings: {stats['completed_bookings']}\n\n"
-        
-        # Add car statistics
-        if stats['car_stats']:
-            text += "🚗 Car Performance:\n"
-            for car_stat in stats['car_stats']:
-                text += f"  • {car_stat['make']} {car_stat['model']} ({car_stat['year']}): {car_stat['bookings']} bookings\n"
-        
-        # Add back button
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Back", callback_data="dealer_back")]
-        ])
-        
-        # Send message with stats
+    # Get stats from database
+    stats = await run_db(db.get_dealer_stats, dealer_id)
+    
+    if not stats:
         await send_or_edit_message(
             callback_query,
-            text,
-            reply_markup=keyboard
+            "No statistics available. You may not have any bookings yet.",
+            reply_markup=_DEALER_MENU
         )
+        return
         
-        # Set state to viewing stats
-        await state.set_state(DealerStates.viewing_stats)
-        
-    except Exception as e:
-        logger.error(f"Error in show_dealer_stats: {e}")
-        await callback_query.message.answer(
-            "❌ An error occurred while retrieving your statistics.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
+    # Create response text
+    text = "📊 Your Booking Statistics:\n\n"
+    
+    # Add stats to text
+    text += (
+        f"🚗 Total Cars: {stats['total_cars']}\n"
+        f"📋 Total Bookings: {stats['total_bookings']}\n"
+        f"✅ Active Bookings: {stats['active_bookings']}\n"
+        f"🔄 Completed Bookings: {stats['completed_bookings']}\n\n"
+    )
+    
+    # Add car statistics
+    if stats['car_stats']:
+        text += "🚗 Car Performance:\n"
+        for car_stat in stats['car_stats']:
+            text += f"  • {car_stat['make']} {car_stat['model']} ({car_stat['year']}): {car_stat['bookings']} bookings\n"
+    
+    # Send message with stats
+    await send_or_edit_message(
+        callback_query,
+        text,
+        reply_markup=_BACK_KB
+    )
+    
+    # Set state to viewing stats
+    await state.set_state(DealerStates.viewing_stats)
 
-@router.callback_query(lambda c: c.data.startswith("delete_dealer_car_"))
+@router.callback_query(F.data.startswith("delete_dealer_car_"))
 async def delete_dealer_car_handler(callback_query: CallbackQuery, state: FSMContext):
     """Handle dealer car deletion"""
-    if not is_admin_group(callback_query.message):
-        await callback_query.answer("❌ This action is only available in the admin group.")
-        return
-        
-    if not is_dealer(callback_query.from_user.id):
-        await callback_query.answer("❌ You are not registered as a dealer.")
+    # Clear the button spinner right away instead of after the message edit
+    spawn(callback_query.answer())
+    
+    # Extract car ID from callback data
+    car_id = int(callback_query.data.replace("delete_dealer_car_", ""))
+    
+    # Store car ID in state
+    await state.update_data(car_id_to_delete=car_id)
+    
+    # Ask for confirmation
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="✅ Yes, delete", callback_data=f"confirm_delete_dealer_car_{car_id}"),
+            _CANCEL_DELETE_BUTTON
+        ]
+    ])
+    
+    await send_or_edit_message(
+        callback_query,
+        f"⚠️ Are you sure you want to delete this car? This action cannot be undone.",
+        reply_markup=keyboard
+    )
+    
+    # Set state to confirming delete
+    await state.set_state(DealerStates.confirming_delete_car)
+
+@router.callback_query(F.data.startswith("confirm_delete_dealer_car_"))
+@per_user_serialized
+async def confirm_delete_dealer_car_handler(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
+    """Handle dealer car deletion confirmation"""
+    if _is_repeat_action(callback_query.from_user.id, callback_query.data):
+        await callback_query.answer("⏳ Already processing...")
         return
-        
+    
+    # Clear the button spinner right away instead of after the message edit
+    spawn(callback_query.answer())
+    
+    # Extract car ID from callback data
+    car_id = int(callback_query.data.replace("confirm_delete_dealer_car_", ""))
+    
+    # Delete car in database
     try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Extract car ID from callback data
-        car_id = int(callback_query.data.replace("delete_dealer_car_", ""))
-        
-        # Store car ID in state
-        await state.update_data(car_id_to_delete=car_id)
-        
-        # Ask for confirmation
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Yes, delete", callback_data=f"confirm_delete_dealer_car_{car_id}"),
-                InlineKeyboardButton(text="❌ No, cancel", callback_data="dealer_my_cars")
-            ]
-        ])
-        
+        success, message = await run_db(db.delete_dealer_car, dealer_id, car_id)
+    except Exception:
+        _forget_action(callback_query.from_user.id, callback_query.data)
+        raise
+    
+    if success:
+        invalidate_car_view(car_id)
+        
+        # Show success message
         await send_or_edit_message(
             callback_query,
-            f"⚠️ Are you sure you want to delete this car? This action cannot be undone.",
-            reply_markup=keyboard
-        )
-        
-        # Set state to confirming delete
-        await state.set_state(DealerStates.confirming_delete_car)
-        
-    except Exception as e:
-        logger.error(f"Error in delete_dealer_car_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred while preparing to delete the car.",
-            reply_markup=kb.dealer_menu_keyboard()
+            f"✅ Car has been deleted successfully.",
+            reply_markup=_DEALER_MENU
         )
-
-@router.callback_query(lambda c: c.data.startswith("confirm_delete_dealer_car_"))
-async def confirm_delete_dealer_car_handler(callback_query: CallbackQuery, state: FSMContext):
-    """Handle dealer car deletion confirmation"""
-    if not is_admin_group(callback_query.message):
-        await callback_query.answer("❌ This action is only available in the admin group.")
-        return
-        
-    if not is_dealer(callback_query.from_user.id):
-        await callback_query.answer("❌ You are not registered as a dealer.")
-        return
-        
-    try:
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
         
-        # Extract car ID from callback data
-        car_id = int(callback_query.data.replace("confirm_delete_dealer_car_", ""))
-        
-        # Get dealer ID from user ID
-        dealer_id = db.get_dealer_id(callback_query.from_user.id)
-        
-        if not dealer_id:
-            await callback_query.answer("❌ You are not registered as a dealer.")
-            return
-            
-        # Delete car in database
-        success, message = db.delete_dealer_car(dealer_id, car_id)
-        
-        if success:
-            # Notify dealer
-            await callback_query.answer("✅ Car deleted successfully")
-            
-            # Show success message
-            await send_or_edit_message(
-                callback_query,
-                f"✅ Car has been deleted successfully.",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            
-            # Clear state
-            await state.clear()
-        else:
-            await callback_query.answer(f"❌ Error: {message}")
-            
-            # Show error message
-            await send_or_edit_message(
-                callback_query,
-                f"❌ Failed to delete car: {message}",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
-            
-    except Exception as e:
-        logger.error(f"Error in confirm_delete_dealer_car_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred while deleting the car.",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
-
-async def back_to_dealer_menu(callback_query: CallbackQuery, state: FSMContext, kb):
-    """Go back to dealer menu"""
-    try:
         # Clear state
         await state.clear()
+    else:
+        # Let the dealer retry straight away
+        _forget_action(callback_query.from_user.id, callback_query.data)
         
-        # Show dealer menu
+        # Show error message
         await send_or_edit_message(
             callback_query,
-            "🚗 Dealer Panel",
-            reply_markup=kb.dealer_menu_keyboard()
-        )
-        
-    except Exception as e:
-        logger.error(f"Error in back_to_dealer_menu: {e}")
-        await callback_query.message.answer(
-            "❌ An error occurred while returning to the dealer menu.",
-            reply_markup=kb.dealer_menu_keyboard()
+            f"❌ Failed to delete car: {message}",
+            reply_markup=_DEALER_MENU
         )
 
-@router.callback_query(lambda c: c.data.startswith("view_dealer_car_"))
-async def view_dealer_car_handler(callback_query: CallbackQuery, state: FSMContext):
+async def back_to_dealer_menu(callback_query: CallbackQuery, state: FSMContext):
+    """Go back to dealer menu"""
+    # Clear state
+    await state.clear()
+    
+    # Show dealer menu
+    await send_or_edit_message(
+        callback_query,
+        "🚗 Dealer Panel",
+        reply_markup=_DEALER_MENU
+    )
+
+@router.callback_query(F.data.startswith("view_dealer_car_"))
+async def view_dealer_car_handler(callback_query: CallbackQuery, state: FSMContext, dealer_id: int):
     """Handle viewing a dealer's car details"""
-    if not is_admin_group(callback_query.message):
-        await callback_query.answer("❌ This action is only available in the admin group.")
-        return
-        
-    if not is_dealer(callback_query.from_user.id):
-        await callback_query.answer("❌ You are not registered as a dealer.")
-        return
-        
-    try:
-        # Extract car_id from callback data
-        car_id = int(callback_query.data.split('_')[-1])
-        
-        # Get dealer ID from user ID 
-        dealer_id = db.get_dealer_id(callback_query.from_user.id)
-        
-        # Get state data
-        state_data = await state.get_data()
-        msgs = state_data.get('msgs', Messages('en'))
-        kb = KeyboardFactory(msgs)
-        
-        # Verify the car belongs to this dealer
-        cars = db.get_dealer_cars(dealer_id)
+    # Extract car_id from callback data
+    car_id = int(callback_query.data.split('_')[-1])
+    
+    now = time.monotonic()
+    cached_view = _get_car_view(car_id, dealer_id, now)
+    if cached_view is not None:
+        car_info, photo = cached_view
+    else:
+        # Use the car from the list this dealer just viewed, if the list is
+        # recent; otherwise load it, with its primary image, checking that it
+        # belongs to this dealer
+        data = await state.get_data()
+        cached = None
+        if time.time() - data.get('cars_listed_at', 0) < _CAR_VIEW_TTL:
+            cached = data.get('cars_by_id', {}).get(str(car_id))
+        if cached is not None:
+            car = db.DealerCar._make(cached)
+        else:
+            car = await run_db(db.get_dealer_car_owned, dealer_id, car_id)
         
-        selected_car = None
-        for car in cars:
-            if car[0] == car_id:
-                selected_car = car
-                break
-                
-        if not selected_car:
-            await callback_query.answer("❌ This car doesn't belong to you or doesn't exist.")
-            return
-            
-        # Get car details with image
-        car_details = db.get_car_details(car_id)
-        if not car_details:
-            await send_or_edit_message(
-                callback_query,
-                "❌ Car details could not be loaded.",
-                reply_markup=kb.dealer_menu_keyboard()
-            )
+        if not car:
+            await callback_query.answer("❌ This car doesn't belong to you or doesn't exist.", show_alert=True)
             return
-            
-        # Format car info
-        make = selected_car[1]
-        model = selected_car[2]
-        year = selected_car[3]
-        available = "✅ Available" if selected_car[4] else "❌ Currently Booked"
-        
-        car_info = f"🚗 {make} {model} ({year})\n"
-        car_info += f"Status: {available}\n"
         
-        # Get primary image
-        images = car_details.get('images', [])
-        photo = None
-        for img in images:
-            if img[1]:  # is_primary
-                photo = img[0]
-                break
-                
-        # Display car with image and keyboard with refresh/delete options
-        await send_or_edit_message(
-            callback_query,
-            car_info,
-            reply_markup=kb.dealer_car_keyboard(car_id),
-            photo=photo,
-            car_id=car_id  # Pass car_id for auto-refresh
-        )
-        
-    except Exception as e:
-        logger.error(f"Error in view_dealer_car_handler: {e}")
-        state_data = await state.get_data()
-        kb = KeyboardFactory(state_data.get('msgs', Messages('en')))
-        await callback_query.message.answer(
-            "❌ An error occurred while viewing car details.",
-            reply_markup=kb.dealer_menu_keyboard()
-        ) 
\ No newline at end of file
+        # Format car info
+        available = "✅ Available" if car.available else "❌ Currently Booked"
+        car_info = f"🚗 {car.make} {car.model} ({car.year})\nStatus: {available}\n"
+        photo = car.image
+        _cache_car_view(car_id, dealer_id, car_info, photo, now)
+    
+    # Ownership is confirmed; stop the spinner before sending the view.
+    # send_or_edit_message posts its own notice if the view cannot be shown
+    spawn(callback_query.answer())
+    
+    # Display car with image and keyboard with refresh/delete options
+    await send_or_edit_message(
+        callback_query,
+        car_info,
+        reply_markup=_EN_KB.dealer_car_keyboard(car_id),
+        photo=photo,
+        car_id=car_id  # Pass car_id for auto-refresh
+    )
@@ -1,15 +1,20 @@
 import os
 import asyncio
+import logging
+import orjson
+from aiohttp import web
 from aiogram import Bot, Dispatcher, BaseMiddleware
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.exceptions import TelegramAPIError
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from dotenv import load_dotenv
 
 # Import utilities and configuration
 from utils.logger import setup_logger, log_critical_error
-from handlers.customer import router as customer_router
-from handlers.admin import router as admin_router
-from handlers.dealer import router as dealer_router
+from utils.storage import create_storage
+from utils.db_async import install_db_executor, run_db
+from utils.helpers import close_session
+from utils.rate_limit import RateLimitMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -23,6 +28,14 @@ if not TELEGRAM_BOT_TOKEN:
     logger.error("TELEGRAM_BOT_TOKEN not found in environment variables!")
     raise ValueError("TELEGRAM_BOT_TOKEN is required to run the bot")
 
+# Webhook settings - when WEBHOOK_URL is set, updates are pushed by Telegram
+# to a local web server instead of being fetched by long polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+
 # Development mode flag - set to True to skip database connection check
 DEVELOPMENT_MODE = False
 
@@ -31,6 +44,10 @@ class ErrorHandlingMiddleware(BaseMiddleware):
     async def __call__(self, handler, event, data):
         try:
             return await handler(event, data)
+        except TelegramRetryAfter as flood_error:
+            # The request was already retried once after the wait; a reply now
+            # would only hit the same limit
+            logger.warning(f"Telegram flood control, retry after {flood_error.retry_after}s")
         except TelegramAPIError as telegram_error:
             # Handle Telegram API errors
             error_msg = f"Telegram API Error: {telegram_error}"
@@ -56,7 +73,8 @@ class ErrorHandlingMiddleware(BaseMiddleware):
         except Exception as e:
             # Handle other unexpected errors
             error_msg = f"Unexpected error in {handler.__name__}: {str(e)}"
-            logger.error(error_msg, exc_info=True)
+            # Formatting the traceback is costly; only do it when debugging
+            logger.error(error_msg, exc_info=logger.isEnabledFor(logging.DEBUG))
             
             # Log critical errors
             log_critical_error("Unexpected Error", e)
@@ -74,12 +92,76 @@ class ErrorHandlingMiddleware(BaseMiddleware):
             if state:
                 await state.clear()
 
+def json_dumps(obj) -> str:
+    """Serialize Bot API payloads with orjson"""
+    return orjson.dumps(obj).decode()
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Serve Telegram updates through a webhook until the process is stopped"""
+    async def register_webhook(bot: Bot):
+        await bot.set_webhook(
+            url=WEBHOOK_URL,
+            max_connections=100,
+            allowed_updates=dp.resolve_used_update_types(),
+            secret_token=WEBHOOK_SECRET
+        )
+    dp.startup.register(register_webhook)
+    
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        logger.info(f"Listening for webhook updates on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+def check_database():
+    """Open and close one database connection, raising if the database is unreachable"""
+    import db
+    try:
+        with db.get_connection():
+            logger.info("Database connection test successful")
+    except Exception as db_error:
+        logger.critical(f"Database connection test failed: {db_error}", exc_info=True)
+        log_critical_error("Database connection test failed", db_error)
+        raise
+
 async def main():
     """Main function to start the bot"""
+    # Blocking database calls run on the loop's default executor
+    install_db_executor()
+    
     # Initialize bot and dispatcher
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
-    storage = MemoryStorage()
+    session = AiohttpSession(json_loads=orjson.loads, json_dumps=json_dumps)
+    bot = Bot(token=TELEGRAM_BOT_TOKEN, session=session)
+    bot.session.middleware(RateLimitMiddleware())
+    
+    # Check the database while Telegram confirms the bot token
+    startup_checks = [bot.get_me()]
+    if not DEVELOPMENT_MODE:
+        startup_checks.append(run_db(check_database))
+    else:
+        logger.warning("Running in DEVELOPMENT MODE - database connection check skipped")
+    try:
+        await asyncio.gather(*startup_checks)
+    except Exception:
+        await bot.session.close()
+        raise
+    
+    # Handlers are imported once the loop is running
+    from handlers.customer import router as customer_router
+    from handlers.admin import router as admin_router
+    from handlers.dealer import router as dealer_router
+    
+    storage = create_storage()
     dp = Dispatcher(storage=storage)
+    dp.shutdown.register(close_session)
+    dp.shutdown.register(storage.close)
     
     # Register middleware
     dp.message.middleware(ErrorHandlingMiddleware())
@@ -90,34 +172,23 @@ async def main():
     dp.include_router(admin_router)
     dp.include_router(dealer_router)
     
-    # Start polling
     logger.info("Starting the Car Rental Bot...")
     
     try:
         # Notify about successful startup
         logger.info("Bot startup successful!")
         
-        # Start polling
-        await dp.start_polling(bot)
+        if WEBHOOK_URL:
+            await run_webhook(dp, bot)
+        else:
+            # Start polling
+            await dp.start_polling(bot)
     except Exception as e:
         logger.critical(f"Error during bot polling: {e}", exc_info=True)
         log_critical_error("Error during bot polling", e)
 
 if __name__ == "__main__":
     try:
-        # Check database connection at startup
-        if not DEVELOPMENT_MODE:
-            import db
-            try:
-                with db.get_connection() as conn:
-                    logger.info("Database connection test successful")
-            except Exception as db_error:
-                logger.critical(f"Database connection test failed: {db_error}", exc_info=True)
-                log_critical_error("Database connection test failed", db_error)
-                raise
-        else:
-            logger.warning("Running in DEVELOPMENT MODE - database connection check skipped")
-        
         # Run the bot
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
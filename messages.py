@@ -1,13 +1,30 @@
-from typing import Dict, Any
+import sys
+from functools import lru_cache
+from typing import Dict, Any, Tuple
 
 class Messages:
     def __init__(self, language: str = 'en'):
         self.language = language.lower()
+        # Resolve the language table once so each lookup is a single dict probe
+        self._messages = _COMPILED.get(self.language, _COMPILED['en'])
         
     def get(self, key: str, **kwargs: Any) -> str:
         """Get message by key and format it with kwargs"""
-        message = MESSAGES.get(self.language, {}).get(key, MESSAGES['en'][key])
-        return message.format(**kwargs) if kwargs else message
+        message, has_placeholder = self._messages.get(key) or _COMPILED['en'][key]
+        if not kwargs or not has_placeholder:
+            return message
+        try:
+            # The type is part of the key so 1, 1.0 and True are cached apart
+            params = tuple(sorted((k, type(v), v) for k, v in kwargs.items()))
+            return _format_message(message, params)
+        except TypeError:
+            # Unhashable argument, format without the cache
+            return message.format(**kwargs)
+
+@lru_cache(maxsize=512)
+def _format_message(template: str, params: tuple) -> str:
+    """Format a template, memoized on the template and its (name, type, value) parameters"""
+    return template.format(**{name: value for name, _, value in params})
 
 # Message templates for different languages
 MESSAGES = {
@@ -41,6 +58,8 @@ MESSAGES = {
         'active_booking': "Your active booking:\n\n{booking_info}",
         'return_success': "✅ Car returned successfully!",
         'return_failed': "❌ Return failed: {reason}",
+        'select_start_date': "Please select the rental start date:",
+        'select_end_date': "Please select the rental end date:",
         
         # Navigation
         'back_btn': "🔙 Back",
@@ -91,6 +110,8 @@ MESSAGES = {
         'active_booking': "Ваше активное бронирование:\n\n{booking_info}",
         'return_success': "✅ Автомобиль успешно возвращен!",
         'return_failed': "❌ Ошибка возврата: {reason}",
+        'select_start_date': "Пожалуйста, выберите дату начала аренды:",
+        'select_end_date': "Пожалуйста, выберите дату окончания аренды:",
         
         # Navigation
         'back_btn': "🔙 Назад",
@@ -110,4 +131,31 @@ MESSAGES = {
         # Contact
         'contact_admin_msg': "Для помощи свяжитесь с группой администраторов.",
     }
-} 
\ No newline at end of file
+}
+
+# Intern catalog strings so each text exists once per process
+for _table in MESSAGES.values():
+    for _key, _text in _table.items():
+        _table[_key] = sys.intern(_text)
+
+# Templates paired with whether they need formatting at all
+_COMPILED: Dict[str, Dict[str, Tuple[str, bool]]] = {
+    lang: {key: (text, '{' in text) for key, text in table.items()}
+    for lang, table in MESSAGES.items()
+}
+
+# Shared Messages instances, one per supported language
+_MESSAGES_CACHE: Dict[str, Messages] = {}
+
+def get_messages(language: str = 'en') -> Messages:
+    """Get the shared Messages instance for a language code
+    
+    Unknown language codes resolve to English.
+    """
+    language = language.lower()
+    if language not in MESSAGES:
+        language = 'en'
+    msgs = _MESSAGES_CACHE.get(language)
+    if msgs is None:
+        msgs = _MESSAGES_CACHE[language] = Messages(language)
+    return msgs
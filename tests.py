@@ -1,12 +1,17 @@
+import asyncio
 import unittest
 import os
 import sys
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timedelta
+from aiogram.exceptions import TelegramRetryAfter
 
 # Import modules to test
 import db
-from messages import Messages
+from messages import Messages, get_messages
+from handlers import dealer
+from utils.keyboards import _TIME_SLOTS, _first_open_slot
+from utils import helpers
 
 class TestDatabaseFunctions(unittest.TestCase):
     """Test cases for database functions"""
@@ -127,6 +132,28 @@ class TestDatabaseFunctions(unittest.TestCase):
         
         # Verify commit was not called
         mock_conn.commit.assert_not_called()
+    
+    @patch('db.get_connection')
+    def test_get_dealer_car_owned(self, mock_get_connection):
+        """Test loading a dealer's car with its primary image in one query"""
+        # Mock the database connection and cursor
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.__enter__.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_get_connection.return_value = mock_conn
+        
+        mock_cursor.fetchone.return_value = (3, 'Toyota', 'Corolla', 2020, True, 'file_id')
+        
+        car = db.get_dealer_car_owned(1, 3)
+        self.assertEqual(car.make, 'Toyota')
+        self.assertEqual(car.image, 'file_id')
+        
+        # Ownership is checked by the query itself
+        mock_cursor.execute.assert_called_once()
+        sql, params = mock_cursor.execute.call_args.args
+        self.assertIn("c.dealer_id = %s", sql)
+        self.assertEqual(params, (3, 1))
 
 class TestMessages(unittest.TestCase):
     """Test cases for message handling"""
@@ -157,10 +184,106 @@ class TestMessages(unittest.TestCase):
         result = msgs.get('welcome_new', name="Test User")
         self.assertEqual(result, "👋 Welcome, Test User! You have been registered as a customer.")
     
+    def test_message_params_keep_type(self):
+        """Test that equal parameters of different types format differently"""
+        msgs = Messages('en')
+        self.assertEqual(msgs.get('welcome_back', name=1.0), "👋 Welcome back, 1.0!")
+        self.assertEqual(msgs.get('welcome_back', name=1), "👋 Welcome back, 1!")
+        self.assertEqual(msgs.get('welcome_back', name=True), "👋 Welcome back, True!")
+    
+    def test_booking_date_prompts(self):
+        """Test that booking date prompts are localized"""
+        self.assertEqual(Messages('en').get('select_start_date'), "Please select the rental start date:")
+        self.assertEqual(Messages('ru').get('select_end_date'), "Пожалуйста, выберите дату окончания аренды:")
+
     def test_fallback_to_english(self):
         """Test fallback to English for unknown language"""
         msgs = Messages('xx')  # Nonexistent language code
         self.assertEqual(msgs.get('main_menu'), "Main Menu:")
+    
+    def test_get_messages_shared_instance(self):
+        """Test that get_messages reuses one instance per language"""
+        self.assertIs(get_messages('ru'), get_messages('RU'))
+        self.assertEqual(get_messages('ru').language, 'ru')
+        self.assertIs(get_messages('xx'), get_messages('en'))
+
+class TestKeyboards(unittest.TestCase):
+    """Test cases for keyboard generation"""
+    
+    def test_first_open_slot(self):
+        """Test that start time slots skip times already past today"""
+        self.assertEqual(_first_open_slot(datetime(2025, 1, 1, 7, 45)), 0)
+        self.assertEqual(_TIME_SLOTS[_first_open_slot(datetime(2025, 1, 1, 8, 0))], "08:30")
+        self.assertEqual(_TIME_SLOTS[_first_open_slot(datetime(2025, 1, 1, 12, 29))], "12:30")
+        self.assertEqual(_TIME_SLOTS[_first_open_slot(datetime(2025, 1, 1, 12, 30))], "13:00")
+        self.assertEqual(_TIME_SLOTS[_first_open_slot(datetime(2025, 1, 1, 20, 15))], "20:30")
+        self.assertEqual(_TIME_SLOTS[_first_open_slot(datetime(2025, 1, 1, 20, 30)):], ())
+
+class TestDealerCache(unittest.TestCase):
+    """Test cases for the dealer lookup cache"""
+    
+    def tearDown(self):
+        dealer.invalidate_dealer_cache()
+    
+    @patch('db.get_dealer_id', return_value=7)
+    def test_resolve_dealer_cached(self, mock_get_dealer_id):
+        """Test that repeated lookups hit the database once"""
+        self.assertEqual(asyncio.run(dealer.resolve_dealer(42)), 7)
+        self.assertEqual(asyncio.run(dealer.resolve_dealer(42)), 7)
+        mock_get_dealer_id.assert_called_once_with(42)
+        
+        # Invalidation forces a fresh lookup
+        dealer.invalidate_dealer_cache(42)
+        asyncio.run(dealer.resolve_dealer(42))
+        self.assertEqual(mock_get_dealer_id.call_count, 2)
+
+class TestCoalescedEdits(unittest.TestCase):
+    """Test cases for merging rapid message edits"""
+    
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the latest edit is sent even if the first caller is cancelled"""
+        msg = MagicMock()
+        msg.edit_text = AsyncMock(side_effect=lambda text, reply_markup=None: text)
+        
+        async def run():
+            first = asyncio.create_task(helpers._coalesced_edit_text(msg, "a"))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(helpers._coalesced_edit_text(msg, "b"))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await asyncio.gather(first, second, return_exceptions=True)
+        
+        first_result, second_result = asyncio.run(run())
+        self.assertIsInstance(first_result, asyncio.CancelledError)
+        self.assertEqual(second_result, "b")
+        msg.edit_text.assert_awaited_once_with("b", reply_markup=None)
+
+class TestDealerErrorMiddleware(unittest.TestCase):
+    """Test cases for dealer error handling"""
+    
+    @patch('handlers.dealer.log_critical_error')
+    def test_error_clears_state(self, mock_log_critical_error):
+        """Test that a failing handler leaves the dealer out of any flow"""
+        state = AsyncMock()
+        message = AsyncMock()
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+        
+        asyncio.run(dealer.DealerErrorMiddleware()(handler, message, {'state': state}))
+        mock_log_critical_error.assert_called_once()
+        state.clear.assert_awaited_once()
+        message.answer.assert_awaited_once()
+    
+    def test_flood_control_passes_through(self):
+        """Test that flood control is left to the dispatcher-level middleware"""
+        state = AsyncMock()
+        message = AsyncMock()
+        error = TelegramRetryAfter(method=MagicMock(), message="Flood control", retry_after=5)
+        handler = AsyncMock(side_effect=error)
+        
+        with self.assertRaises(TelegramRetryAfter):
+            asyncio.run(dealer.DealerErrorMiddleware()(handler, message, {'state': state}))
+        state.clear.assert_not_awaited()
+        message.answer.assert_not_awaited()
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
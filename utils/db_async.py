@@ -0,0 +1,23 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads available to blocking database calls
+DB_WORKERS = 16
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function in a worker thread
+    
+    Args:
+        func: Function from the db module
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        Whatever func returns
+    """
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+def install_db_executor():
+    """Size the running loop's default executor for database calls"""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db"))
@@ -1,6 +1,7 @@
 import logging
 import aiohttp
 import asyncio
+from typing import Dict, Optional, Set, Tuple
 from aiogram.types import Message, CallbackQuery, URLInputFile, BufferedInputFile
 from aiogram.exceptions import TelegramAPIError
 
@@ -11,6 +12,47 @@ from config.config import ADMIN_GROUP_ID
 # Import db when needed to avoid circular imports
 import db
 
+# How booking dates and times are shown to users
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Background tasks started by spawn(); holding them here keeps them from
+# being garbage collected before they finish
+_BG: Set[asyncio.Task] = set()
+
+def spawn(coro) -> asyncio.Task:
+    """Run a coroutine in the background without waiting for it
+    
+    Args:
+        coro: Coroutine to run
+        
+    Returns:
+        The created task
+    """
+    task = asyncio.create_task(coro)
+    _BG.add(task)
+    task.add_done_callback(_BG.discard)
+    return task
+
+# Shared HTTP session for image downloads, created on first use
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get the shared aiohttp session, creating it if needed"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return _SESSION
+
+async def close_session():
+    """Close the shared aiohttp session on shutdown"""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
 async def download_image(url, timeout=10):
     """Download image from URL with timeout
     
@@ -25,13 +67,13 @@ async def download_image(url, timeout=10):
         # Use shorter timeout to avoid long waits
         timeout_obj = aiohttp.ClientTimeout(total=timeout)
         
-        async with aiohttp.ClientSession(timeout=timeout_obj) as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.read()
-                else:
-                    logger.warning(f"Failed to download image, status code: {response.status}")
-                    return None
+        session = await get_session()
+        async with session.get(url, timeout=timeout_obj) as response:
+            if response.status == 200:
+                return await response.read()
+            else:
+                logger.warning(f"Failed to download image, status code: {response.status}")
+                return None
     except asyncio.TimeoutError:
         logger.warning(f"Timeout while downloading image from {url}")
         return None
@@ -39,6 +81,78 @@ async def download_image(url, timeout=10):
         logger.warning(f"Error downloading image from {url}: {e}")
         return None
 
+# Text edits waiting to be sent, keyed by (chat ID, message ID):
+# [message, latest text, latest keyboard, future with the edit's result]
+_EDIT_WINDOW = 0.08
+_PENDING_EDITS: Dict[Tuple[int, int], list] = {}
+
+async def _coalesced_edit_text(msg_obj, text: str, reply_markup=None):
+    """Edit a message's text, merging edits to the same message within a short window
+    
+    Only the last text and keyboard requested in the window are sent; every
+    caller gets the result of that single edit. The edit is sent by a
+    background task, so cancelling one caller does not affect the others.
+    """
+    key = (msg_obj.chat.id, msg_obj.message_id)
+    pending = _PENDING_EDITS.get(key)
+    if pending is None:
+        future = asyncio.get_running_loop().create_future()
+        pending = _PENDING_EDITS[key] = [msg_obj, text, reply_markup, future]
+        spawn(_flush_edit(key))
+    else:
+        pending[0], pending[1], pending[2] = msg_obj, text, reply_markup
+    return await asyncio.shield(pending[3])
+
+async def _flush_edit(key: Tuple[int, int]):
+    """Send the latest pending edit for a message once the window has passed"""
+    future = _PENDING_EDITS[key][3]
+    try:
+        await asyncio.sleep(_EDIT_WINDOW)
+        msg_obj, text, reply_markup, _ = _PENDING_EDITS.pop(key)
+        result = await msg_obj.edit_text(text, reply_markup=reply_markup)
+    except asyncio.CancelledError:
+        _PENDING_EDITS.pop(key, None)
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark it retrieved in case every caller has gone away
+        future.exception()
+    else:
+        future.set_result(result)
+
+# Telegram file IDs of images already uploaded from a URL
+_URL_TO_FILE_ID: Dict[str, str] = {}
+
+async def _answer_photo(msg_obj, photo, caption: str, reply_markup=None):
+    """Send a photo, uploading an image URL only the first time it is used
+    
+    Args:
+        msg_obj: Message to answer
+        photo: Telegram file_id or image URL
+        caption: Photo caption
+        reply_markup: Keyboard markup to attach
+        
+    Returns:
+        The sent message object
+    """
+    if not (isinstance(photo, str) and photo.startswith('http')):
+        # Already a Telegram file_id
+        return await msg_obj.answer_photo(photo=photo, caption=caption, reply_markup=reply_markup)
+    
+    file_id = _URL_TO_FILE_ID.get(photo)
+    if file_id is not None:
+        try:
+            return await msg_obj.answer_photo(photo=file_id, caption=caption, reply_markup=reply_markup)
+        except TelegramAPIError as e:
+            logger.warning(f"Cached file ID for {photo} was rejected, uploading again: {e}")
+            _URL_TO_FILE_ID.pop(photo, None)
+    
+    sent = await msg_obj.answer_photo(photo=URLInputFile(photo), caption=caption, reply_markup=reply_markup)
+    if sent.photo:
+        _URL_TO_FILE_ID[photo] = sent.photo[-1].file_id
+    return sent
+
 async def send_or_edit_message(message, text: str, reply_markup=None, photo=None, car_id=None):
     """Helper function to handle message sending/editing with error handling
     
@@ -53,20 +167,20 @@ async def send_or_edit_message(message, text: str, reply_markup=None, photo=None
         The sent or edited message object
     """
     try:
-        logger.info(f"send_or_edit_message called with photo={bool(photo)}, reply_markup={bool(reply_markup)}")
+        logger.debug("send_or_edit_message called with photo=%s, reply_markup=%s", bool(photo), bool(reply_markup))
         
         # Handle CallbackQuery vs Message object
         is_callback = isinstance(message, CallbackQuery)
         msg_obj = message.message if is_callback else message
         
         # Check if current message has photo (if we're editing a message with photo)
-        has_photo = hasattr(msg_obj, 'photo') and bool(msg_obj.photo)
-        logger.info(f"Current message has photo: {has_photo}")
+        has_photo = getattr(msg_obj, 'photo', None) is not None
+        logger.debug("Current message has photo: %s", has_photo)
         
         # Special case: switching from photo to text or text to photo
         # In this case, we need to delete the old message and send a new one
         if (has_photo and not photo) or (not has_photo and photo):
-            logger.info("Message type changing (photo <-> text), deleting old message")
+            logger.debug("Message type changing (photo <-> text), deleting old message")
             try:
                 await msg_obj.delete()
             except Exception as e:
@@ -75,54 +189,41 @@ async def send_or_edit_message(message, text: str, reply_markup=None, photo=None
             # Send as a new message
             if photo:
                 # Handle photo case
-                if isinstance(photo, str) and photo.startswith('http'):
-                    photo_file = URLInputFile(photo)
-                else:
-                    photo_file = photo
-                
-                logger.info("Sending new photo message")
-                return await msg_obj.answer_photo(photo=photo_file, caption=text, reply_markup=reply_markup)
+                logger.debug("Sending new photo message")
+                return await _answer_photo(msg_obj, photo, text, reply_markup)
             else:
                 # Handle text case
-                logger.info("Sending new text message")
+                logger.debug("Sending new text message")
                 return await msg_obj.answer(text, reply_markup=reply_markup)
         
         # Normal flow continues
         if photo:
             try:
-                # Check if the photo is a URL (starts with http)
-                if isinstance(photo, str) and photo.startswith('http'):
-                    # Create a URLInputFile for the photo URL
-                    photo_file = URLInputFile(photo)
-                else:
-                    # Use as is (assuming it's a valid Telegram file_id)
-                    photo_file = photo
-                
                 # For messages with photos, always send new message if not already
                 # a callback (because we can't edit a text message to be a photo)
                 if not is_callback:
-                    logger.info("Direct photo message")
-                    return await msg_obj.answer_photo(photo=photo_file, caption=text, reply_markup=reply_markup)
+                    logger.debug("Direct photo message")
+                    return await _answer_photo(msg_obj, photo, text, reply_markup)
                 else:
                     # For callback queries with photo messages
                     if has_photo:
                         # If current message already has photo, we should send a new one
                         # because we can't edit photo messages
                         try:
-                            logger.info("Replacing photo message")
+                            logger.debug("Replacing photo message")
                             await msg_obj.delete()
                         except Exception as e:
                             logger.warning(f"Could not delete old photo message: {e}")
                     
-                    logger.info("Sending new photo message from callback")
-                    return await msg_obj.answer_photo(photo=photo_file, caption=text, reply_markup=reply_markup)
+                    logger.debug("Sending new photo message from callback")
+                    return await _answer_photo(msg_obj, photo, text, reply_markup)
             except TelegramAPIError as e:
                 error_str = str(e).lower()
                 
                 # Handle Telegram file ID errors specifically
                 if "wrong remote file identifier" in error_str and car_id is not None:
                     logger.warning(f"Invalid file ID detected for car #{car_id}. Error: {e}")
-                    logger.info(f"Invalid file ID value: {photo}")
+                    logger.debug("Invalid file ID value: %s", photo)
                 
                 # Fall back to text message
                 logger.warning(f"Failed to send photo, falling back to text: {e}")
@@ -130,22 +231,29 @@ async def send_or_edit_message(message, text: str, reply_markup=None, photo=None
         else:
             # For text messages, try to edit if possible
             try:
-                if is_callback and not has_photo:
-                    logger.info("Editing existing text message")
-                    return await msg_obj.edit_text(text, reply_markup=reply_markup)
+                if is_callback and not has_photo and msg_obj.text == text:
+                    # Same text: nothing to send, or only swap the keyboard
+                    if msg_obj.reply_markup == reply_markup:
+                        logger.debug("Message unchanged, skipping edit")
+                        return msg_obj
+                    logger.debug("Editing keyboard of existing text message")
+                    return await msg_obj.edit_reply_markup(reply_markup=reply_markup)
+                elif is_callback and not has_photo:
+                    logger.debug("Editing existing text message")
+                    return await _coalesced_edit_text(msg_obj, text, reply_markup)
                 else:
                     # Otherwise, send new message
-                    logger.info("Sending new text message")
+                    logger.debug("Sending new text message")
                     return await msg_obj.answer(text, reply_markup=reply_markup)
             except TelegramAPIError as e:
                 error_str = str(e).lower()
                 if "message is not modified" in error_str:
                     # Message is the same, ignore this error
-                    logger.info("Message not modified, ignoring")
+                    logger.debug("Message not modified, ignoring")
                     return msg_obj
                 elif "there is no text in the message to edit" in error_str:
                     # Message was probably deleted or is media, send new one
-                    logger.info("Cannot edit, sending new message")
+                    logger.debug("Cannot edit, sending new message")
                     return await msg_obj.answer(text, reply_markup=reply_markup)
                 else:
                     logger.error(f"Telegram API error: {e}")
@@ -172,30 +280,25 @@ def is_admin_group(message):
     Returns:
         bool: True if message is from admin group
     """
-    try:
-        chat_id = message.chat.id
-        logger.info(f"Checking admin group: message chat_id={chat_id}, ADMIN_GROUP_ID={ADMIN_GROUP_ID}")
-        return chat_id == ADMIN_GROUP_ID
-    except Exception as e:
-        logger.error(f"Error in is_admin_group check: {e}")
-        return False
+    # ADMIN_GROUP_ID is already parsed to an int by config
+    return message.chat.id == ADMIN_GROUP_ID
 
 def format_car_info(car):
     """Format car information for display
     
     Args:
-        car: Car tuple from database
+        car: CarDetails row from database
         
     Returns:
         str: Formatted car information
     """
-    return f"🚗 {car[1]} {car[2]} ({car[3]})\n👤 Dealer: {car[4]}"
+    return f"🚗 {car.make} {car.model} ({car.year})\n👤 Dealer: {car.dealer}"
 
 def format_booking_info(booking):
     """Format booking information for display
     
     Args:
-        booking: Booking tuple from database
+        booking: ActiveBooking row from database
         
     Returns:
         str: Formatted booking information
@@ -203,6 +306,6 @@ def format_booking_info(booking):
     if not booking:
         return "No active booking found."
     
-    start_date = booking[2].strftime("%Y-%m-%d %H:%M")
-    end_date = booking[3].strftime("%Y-%m-%d %H:%M") if booking[3] else "Active"
-    return f"🚗 {booking[4]} {booking[5]} ({booking[6]})\n📅 From: {start_date}\n📅 To: {end_date}" 
\ No newline at end of file
+    start_date = booking.start_date.strftime(DATETIME_FORMAT)
+    end_date = booking.end_date.strftime(DATETIME_FORMAT) if booking.end_date else "Active"
+    return f"🚗 {booking.make} {booking.model} ({booking.year})\n📅 From: {start_date}\n📅 To: {end_date}" 
\ No newline at end of file
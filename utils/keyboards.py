@@ -1,14 +1,116 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
 
+from messages import get_messages
+
 logger = logging.getLogger(__name__)
 
+
+def _button(text: str, callback_data: str) -> InlineKeyboardButton:
+    """Build a callback button without pydantic validation"""
+    return InlineKeyboardButton.model_construct(text=text, callback_data=callback_data)
+
+
+def _markup(rows) -> InlineKeyboardMarkup:
+    """Build a markup from button rows without pydantic validation"""
+    return InlineKeyboardMarkup.model_construct(inline_keyboard=rows)
+
+
+# The dealer menu has no translated text, so one markup serves every language
+_DEALER_MENU_KB = _markup([
+    [_button("➕ Add New Car", "dealer_add_car")],
+    [_button("🚗 My Cars", "dealer_my_cars")],
+    [_button("📊 Booking Statistics", "dealer_stats")]
+])
+
+# Same for the admin menu
+_ADMIN_MENU_KB = _markup([
+    [_button("📋 View Bookings", "admin_all_bookings")],
+    [_button("👥 View Dealers", "admin_dealers")]
+])
+
+# Date keyboards by (day, for_start); they only change at midnight
+_DATE_KB_CACHE = {}
+
+# Half-hour booking slots from 08:00 to 20:30, and the rows closing the time keyboards
+_TIME_SLOTS = tuple(f"{hour:02d}:{minute:02d}" for hour in range(8, 21) for minute in (0, 30))
+_DATE_BACK_ROW = [_button("🔙 Back", "list_cars"), _button("❌ Cancel", "back_to_menu")]
+_TIME_BACK_ROWS = {
+    True: [_button("🔙 Back", "start_date_back"), _button("❌ Cancel", "back_to_menu")],
+    False: [_button("🔙 Back", "end_date_back"), _button("❌ Cancel", "back_to_menu")]
+}
+
+_LANGUAGE_ROW = [_button("🇬🇧 English", "lang_en"), _button("🇷🇺 Русский", "lang_ru")]
+
+
+def _first_open_slot(now: datetime) -> int:
+    """Index in _TIME_SLOTS of the first slot still bookable today
+    
+    The slots of the current hour that start at or before the current
+    minute are past; before 08:00 every slot is open.
+    """
+    if now.hour < 8:
+        return 0
+    return (now.hour - 8) * 2 + (2 if now.minute >= 30 else 1)
+
+
+@lru_cache(maxsize=None)
+def _back_button_row(language: str, callback_data: str) -> list:
+    """Back button row for a language, shared by every keyboard that uses it"""
+    return [_button(get_messages(language).get('back_btn'), callback_data)]
+
+
+# Keyboards for single cars and bookings, cached per language and ID as
+# module-level functions so the caches hold no factory instances
+
+@lru_cache(maxsize=1024)
+def _car_details_keyboard(language: str, car_id) -> InlineKeyboardMarkup:
+    """Keyboard for car details with a book button"""
+    logger.debug("Creating car details keyboard for car ID: %s", car_id)
+    return _markup([
+        [_button(get_messages(language).get('book_car_btn'), f"book_{car_id}")],
+        _back_button_row(language, "list_cars")
+    ])
+
+
+@lru_cache(maxsize=1024)
+def _booking_details_keyboard(language: str, booking_id) -> InlineKeyboardMarkup:
+    """Keyboard for booking details with a return button"""
+    return _markup([
+        [_button(get_messages(language).get('return_car_btn'), f"return_{booking_id}")],
+        _back_button_row(language, "back_to_menu")
+    ])
+
+
+@lru_cache(maxsize=1024)
+def _dealer_car_keyboard(language: str, car_id) -> InlineKeyboardMarkup:
+    """Keyboard for dealer car actions"""
+    msgs = get_messages(language)
+    return _markup([
+        [_button(msgs.get('delete_car'), f"delete_dealer_car_{car_id}")],
+        [_button("🔄 Refresh Image", f"refresh_car_image_{car_id}")],
+        [_button(msgs.get('back'), "dealer_my_cars")]
+    ])
+
+
 class KeyboardFactory:
     """Factory class for keyboard generation"""
     
     def __init__(self, messages):
         self.msgs = messages
+        # Keyboards that only depend on the language are built once;
+        # Messages instances never change, so they need no invalidation
+        self._back_row = _back_button_row(messages.language, "back_to_menu")
+        self._lang_kb = _markup([_LANGUAGE_ROW])
+        self._lang_kb_back = _markup([_LANGUAGE_ROW, self._back_row])
+        self._main_menu = _markup([
+            [_button(messages.get('list_cars_btn'), "list_cars_command")],
+            [_button(messages.get('my_booking_btn'), "my_booking")],
+            [_button(messages.get('contact_admin_btn'), "contact_admin")],
+            [_button(messages.get('change_language_btn'), "change_language")]
+        ])
     
     def language_keyboard(self, show_back_button: bool = False):
         """Generate language selection keyboard
@@ -16,26 +118,11 @@ class KeyboardFactory:
         Args:
             show_back_button: Whether to show the back button (only for language change, not initial selection)
         """
-        keyboard = [
-            [
-                InlineKeyboardButton(text="🇬🇧 English", callback_data="lang_en"),
-                InlineKeyboardButton(text="🇷🇺 Русский", callback_data="lang_ru")
-            ]
-        ]
-        
-        if show_back_button:
-            keyboard.append([InlineKeyboardButton(text=self.msgs.get('back_btn'), callback_data="back_to_menu")])
-        
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+        return self._lang_kb_back if show_back_button else self._lang_kb
     
     def main_menu_keyboard(self):
         """Generate main menu keyboard"""
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=self.msgs.get('list_cars_btn'), callback_data="list_cars_command")],
-            [InlineKeyboardButton(text=self.msgs.get('my_booking_btn'), callback_data="my_booking")],
-            [InlineKeyboardButton(text=self.msgs.get('contact_admin_btn'), callback_data="contact_admin")],
-            [InlineKeyboardButton(text=self.msgs.get('change_language_btn'), callback_data="change_language")]
-        ])
+        return self._main_menu
     
     def car_list_keyboard(self, cars, page=0, page_size=5):
         """Generate keyboard for car list with pagination
@@ -48,99 +135,58 @@ class KeyboardFactory:
         Returns:
             InlineKeyboardMarkup: Keyboard with car buttons and pagination controls
         """
-        keyboard = []
-        
         # Calculate pagination
-        total_cars = len(cars)
-        total_pages = (total_cars + page_size - 1) // page_size
+        total_pages = -(-len(cars) // page_size)
         start_idx = page * page_size
-        end_idx = min(start_idx + page_size, total_cars)
         
-        # Add car buttons for current page
-        for i in range(start_idx, end_idx):
-            car = cars[i]
-            keyboard.append([
-                InlineKeyboardButton(
-                    text=f"{car[1]} {car[2]} ({car[3]})",
-                    callback_data=f"car_{car[0]}"
-                )
-            ])
+        # Add car buttons for current page; unpack each row once instead of indexing it
+        keyboard = [
+            [_button(f"{make} {model} ({year})", f"car_{car_id}")]
+            for car_id, make, model, year, *_ in cars[start_idx:start_idx + page_size]
+        ]
         
         # Add pagination controls if needed
         if total_pages > 1:
             pagination_row = []
             
-            # Previous page button
+            # Previous and next page buttons, labelled with the page they open
             if page > 0:
-                pagination_row.append(
-                    InlineKeyboardButton(text="⬅️ Prev", callback_data=f"car_page_{page-1}")
-                )
-                
-            # Page indicator
-            pagination_row.append(
-                InlineKeyboardButton(text=f"📄 {page+1}/{total_pages}", callback_data="noop")
-            )
-            
-            # Next page button
+                pagination_row.append(_button(f"⬅️ {page}/{total_pages}", f"car_page_{page-1}"))
             if page < total_pages - 1:
-                pagination_row.append(
-                    InlineKeyboardButton(text="Next ➡️", callback_data=f"car_page_{page+1}")
-                )
+                pagination_row.append(_button(f"{page+2}/{total_pages} ➡️", f"car_page_{page+1}"))
                 
             keyboard.append(pagination_row)
         
         # Add back button
-        keyboard.append([InlineKeyboardButton(text=self.msgs.get('back_btn'), callback_data="back_to_menu")])
+        keyboard.append(self._back_row)
         
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+        return _markup(keyboard)
     
     def car_details_keyboard(self, car_id):
-        """Generate keyboard for car details with cancel option"""
-        # Ensure car_id is correctly formatted
-        car_id_str = str(car_id)
-        logger.info(f"Creating car details keyboard for car ID: {car_id_str}")
-        
-        # Create buttons with clear IDs
-        book_button = InlineKeyboardButton(
-            text=self.msgs.get('book_car_btn'), 
-            callback_data=f"book_{car_id_str}"
-        )
-        back_button = InlineKeyboardButton(
-            text=self.msgs.get('back_btn'), 
-            callback_data="list_cars"
-        )
-        
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [book_button],
-            [back_button]
-        ])
+        """Generate keyboard for car details with cancel option, built once per car and language"""
+        return _car_details_keyboard(self.msgs.language, car_id)
     
     def booking_details_keyboard(self, booking_id):
-        """Generate keyboard for booking details with cancel option"""
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=self.msgs.get('return_car_btn'), callback_data=f"return_{booking_id}")],
-            [InlineKeyboardButton(text=self.msgs.get('back_btn'), callback_data="back_to_menu")]
-        ])
+        """Generate keyboard for booking details with cancel option, built once per booking and language"""
+        return _booking_details_keyboard(self.msgs.language, booking_id)
     
     def admin_menu_keyboard(self):
         """Generate admin menu keyboard"""
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📋 View Bookings", callback_data="admin_all_bookings")],
-            [InlineKeyboardButton(text="👥 View Dealers", callback_data="admin_dealers")]
-        ])
+        return _ADMIN_MENU_KB
     
     def dealer_menu_keyboard(self):
         """Generate dealer menu keyboard"""
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="➕ Add New Car", callback_data="dealer_add_car")],
-            [InlineKeyboardButton(text="🚗 My Cars", callback_data="dealer_my_cars")],
-            [InlineKeyboardButton(text="📊 Booking Statistics", callback_data="dealer_stats")]
-        ])
+        return _DEALER_MENU_KB
     
     def generate_date_keyboard(self, for_start=True):
-        """Generate keyboard with dates for booking"""
-        keyboard = []
+        """Generate keyboard with dates for booking, built once per day"""
         today = datetime.now()
+        key = (today.date(), for_start)
+        cached = _DATE_KB_CACHE.get(key)
+        if cached is not None:
+            return cached
+        
+        keyboard = []
         
         # Generate dates for next 7 days
         for i in range(7):
@@ -155,47 +201,47 @@ class KeyboardFactory:
                 display_str = "Tomorrow, " + display_str
                 
             prefix = "start_date_" if for_start else "end_date_"
-            keyboard.append([InlineKeyboardButton(text=display_str, callback_data=f"{prefix}{date_str}")])
+            keyboard.append([_button(display_str, f"{prefix}{date_str}")])
             
         # Add back button
-        keyboard.append([
-            InlineKeyboardButton(text="🔙 Back", callback_data="list_cars"),
-            InlineKeyboardButton(text="❌ Cancel", callback_data="back_to_menu")
-        ])
+        keyboard.append(_DATE_BACK_ROW)
         
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+        # Drop keyboards from previous days
+        for old_key in [k for k in _DATE_KB_CACHE if k[0] < key[0]]:
+            del _DATE_KB_CACHE[old_key]
+        markup = _DATE_KB_CACHE[key] = _markup(keyboard)
+        return markup
     
     def generate_time_keyboard(self, for_start=True):
         """Generate keyboard with time slots for booking"""
-        keyboard = []
-        now = datetime.now()
-        start_hour = now.hour if for_start and now.hour >= 8 else 8
-        
-        # Generate time slots from start_hour to 20:00
-        for hour in range(start_hour, 21):
-            for minute in [0, 30]:
-                # Skip times in the past for today
-                if for_start and hour == now.hour and minute <= now.minute:
-                    continue
-                    
-                time_str = f"{hour:02d}:{minute:02d}"
-                display_str = time_str
-                prefix = "start_time_" if for_start else "end_time_"
-                keyboard.append([InlineKeyboardButton(text=display_str, callback_data=f"{prefix}{time_str}")])
+        # Start times skip the slots already past today
+        first = _first_open_slot(datetime.now()) if for_start else 0
+        prefix = "start_time_" if for_start else "end_time_"
+        keyboard = [[_button(slot, f"{prefix}{slot}")] for slot in _TIME_SLOTS[first:]]
         
         # Add back button and cancel button
-        back_callback = "start_date_back" if for_start else "end_date_back"
-        keyboard.append([
-            InlineKeyboardButton(text="🔙 Back", callback_data=back_callback),
-            InlineKeyboardButton(text="❌ Cancel", callback_data="back_to_menu")
-        ])
+        keyboard.append(_TIME_BACK_ROWS[for_start])
         
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+        return _markup(keyboard)
     
     def dealer_car_keyboard(self, car_id):
-        """Keyboard for dealer car actions"""
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=self.msgs.get('delete_car'), callback_data=f"delete_dealer_car_{car_id}")],
-            [InlineKeyboardButton(text="🔄 Refresh Image", callback_data=f"refresh_car_image_{car_id}")],
-            [InlineKeyboardButton(text=self.msgs.get('back'), callback_data="dealer_my_cars")]
-        ]) 
\ No newline at end of file
+        """Keyboard for dealer car actions, built once per car and language"""
+        return _dealer_car_keyboard(self.msgs.language, car_id)
+
+
+# Shared KeyboardFactory instances, one per language
+_FACTORY_CACHE = {}
+
+def get_keyboard_factory(messages):
+    """Get the shared KeyboardFactory for a Messages instance
+    
+    Args:
+        messages: Messages instance whose language the keyboards use
+        
+    Returns:
+        KeyboardFactory: Factory reused across requests for that language
+    """
+    factory = _FACTORY_CACHE.get(messages.language)
+    if factory is None:
+        factory = _FACTORY_CACHE[messages.language] = KeyboardFactory(messages)
+    return factory
@@ -1,7 +1,9 @@
 import os
+import atexit
+import queue
 import logging
+import threading
 import logging.handlers
-from datetime import datetime
 
 def setup_logger(log_level=None):
     """Set up application logging with proper formatting and file rotation
@@ -40,6 +42,10 @@ def setup_logger(log_level=None):
     logger = logging.getLogger()
     logger.setLevel(numeric_level)
     logger.handlers = []  # Remove any existing handlers
+    if getattr(logger, '_listener', None) is not None:
+        # Flush and stop the queue listener from a previous setup
+        atexit.unregister(logger._listener.stop)
+        logger._listener.stop()
     
     # Create formatters
     detailed_formatter = logging.Formatter(
@@ -53,25 +59,64 @@ def setup_logger(log_level=None):
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(simple_formatter)
     console_handler.setLevel(numeric_level)
-    logger.addHandler(console_handler)
     
-    # Create rotating file handler for persistent logs
-    log_filename = os.path.join('logs', f'car_rental_{datetime.now().strftime("%Y-%m-%d")}.log')
-    file_handler = logging.handlers.RotatingFileHandler(
-        log_filename,
-        maxBytes=10 * 1024 * 1024,  # 10 MB
-        backupCount=5,
+    # Create daily rotating file handler for persistent logs; past days are
+    # kept as car_rental.log.YYYY-MM-DD
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        os.path.join('logs', 'car_rental.log'),
+        when='midnight',
+        backupCount=14,
         encoding='utf-8'
     )
     file_handler.setFormatter(detailed_formatter)
     file_handler.setLevel(numeric_level)
-    logger.addHandler(file_handler)
+    
+    # Write records from a background thread so logging calls never wait on I/O
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    logger._listener = listener
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     # Log startup message
-    logger.info(f"Logger initialized with level {log_level}")
+    logger.info("Logger initialized with level %s", log_level)
     
     return logger
 
+# Logger for critical errors, set up on first use
+_critical_logger = None
+_critical_lock = threading.Lock()
+
+def _get_critical_logger():
+    """Get the critical error logger, creating its file handler once"""
+    global _critical_logger
+    if _critical_logger is None:
+        with _critical_lock:
+            if _critical_logger is None:
+                os.makedirs('logs', exist_ok=True)
+                
+                critical_logger = logging.getLogger('critical')
+                critical_logger.setLevel(logging.CRITICAL)
+                critical_logger.handlers = []  # Remove any existing handlers
+                
+                # Create critical error file handler, written from a background thread
+                critical_file = os.path.join('logs', 'critical_errors.log')
+                critical_handler = logging.FileHandler(critical_file)
+                critical_handler.setFormatter(logging.Formatter('%(message)s\n---'))
+                log_queue = queue.SimpleQueue()
+                listener = logging.handlers.QueueListener(log_queue, critical_handler)
+                listener.start()
+                atexit.register(listener.stop)
+                
+                # Records are formatted before they are queued; the traceback,
+                # if any, is rendered once by the standard exc_info handling
+                queue_handler = logging.handlers.QueueHandler(log_queue)
+                queue_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+                critical_logger.addHandler(queue_handler)
+                _critical_logger = critical_logger
+    return _critical_logger
+
 # Log critical errors to a separate file
 def log_critical_error(message, exception=None):
     """Log critical errors to a separate file for monitoring
@@ -80,22 +125,10 @@ def log_critical_error(message, exception=None):
         message: Error message
         exception: Exception object if available
     """
-    os.makedirs('logs', exist_ok=True)
-    
-    critical_logger = logging.getLogger('critical')
-    critical_logger.setLevel(logging.CRITICAL)
-    critical_logger.handlers = []  # Remove any existing handlers
-    
-    # Create critical error file handler
-    critical_file = os.path.join('logs', 'critical_errors.log')
-    critical_handler = logging.FileHandler(critical_file)
-    critical_handler.setFormatter(
-        logging.Formatter('%(asctime)s - %(message)s\nException: %(exc_info)s\n---')
-    )
-    critical_logger.addHandler(critical_handler)
+    critical_logger = _get_critical_logger()
     
     # Log the error
     if exception:
         critical_logger.critical(message, exc_info=exception)
     else:
-        critical_logger.critical(message) 
\ No newline at end of file
+        critical_logger.critical(message)
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from typing import Dict, Tuple
+
+from aiolimiter import AsyncLimiter
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    EditMessageCaption,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    SendMessage,
+    SendPhoto,
+)
+
+# Telegram allows about 30 messages per second overall and one per second per chat;
+# stay a little below the global limit
+GLOBAL_RATE = 25
+PER_CHAT_RATE = 1
+
+# A chat's limiter is dropped after this many seconds without messages;
+# by then its bucket has long drained, so a fresh one behaves the same
+IDLE_TIMEOUT = 60
+
+# Methods that count against the message limits
+LIMITED_METHODS = (SendMessage, SendPhoto, EditMessageText, EditMessageReplyMarkup, EditMessageCaption)
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """Delay outgoing messages so the bot stays within Telegram's rate limits
+
+    A request rejected by flood control is retried once after the wait Telegram asks for.
+    """
+
+    def __init__(self):
+        self._global = AsyncLimiter(GLOBAL_RATE, 1)
+        # Chat ID -> (limiter, last time it was used)
+        self._per_chat: Dict[int, Tuple[AsyncLimiter, float]] = {}
+        self._next_sweep = time.monotonic() + IDLE_TIMEOUT
+
+    async def __call__(self, make_request, bot, method):
+        if not isinstance(method, LIMITED_METHODS) or method.chat_id is None:
+            return await self._send(make_request, bot, method)
+
+        # Wait for the chat first so a slow chat does not use up global capacity
+        async with self._chat_limiter(method.chat_id), self._global:
+            return await self._send(make_request, bot, method)
+
+    def _chat_limiter(self, chat_id) -> AsyncLimiter:
+        """Get a chat's limiter, dropping limiters of idle chats now and then"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            for idle in [c for c, (_, used) in self._per_chat.items() if now - used >= IDLE_TIMEOUT]:
+                del self._per_chat[idle]
+            self._next_sweep = now + IDLE_TIMEOUT
+
+        entry = self._per_chat.get(chat_id)
+        limiter = entry[0] if entry is not None else AsyncLimiter(PER_CHAT_RATE, 1)
+        self._per_chat[chat_id] = (limiter, now)
+        return limiter
+
+    @staticmethod
+    async def _send(make_request, bot, method):
+        """Make the request, retrying once if Telegram asks to slow down"""
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            return await make_request(bot, method)
@@ -0,0 +1,124 @@
+import os
+from typing import Any, Dict, Optional
+
+import orjson
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+try:
+    from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+    from redis.exceptions import WatchError
+except ImportError:  # redis is only needed when REDIS_URL is set
+    DefaultKeyBuilder = RedisStorage = WatchError = None
+
+
+class BatchedMemoryStorage(MemoryStorage):
+    """MemoryStorage that can switch state and merge data in a single write"""
+
+    async def set_state_and_data(
+        self, key: StorageKey, state: StateType, data: Dict[str, Any], merge: bool = True
+    ) -> None:
+        """Set the state and merge data into (or replace) the record for key"""
+        record = self.storage[key]
+        record.state = state.state if isinstance(state, State) else state
+        if not merge:
+            record.data = dict(data)
+        elif data:
+            record.data = {**record.data, **data}
+
+
+if RedisStorage is not None:
+    class BatchedRedisStorage(RedisStorage):
+        """RedisStorage that writes the state and merged data in one transaction"""
+
+        async def set_state_and_data(
+            self, key: StorageKey, state: StateType, data: Dict[str, Any], merge: bool = True
+        ) -> None:
+            """Set the state and merge data into (or replace) the record for key
+
+            The data key is watched while it is merged, so a write that lands
+            between the read and the transaction makes the merge start over
+            instead of being lost.
+            """
+            state_key = self.key_builder.build(key, "state")
+            data_key = self.key_builder.build(key, "data")
+            async with self.redis.pipeline(transaction=True) as pipe:
+                while True:
+                    try:
+                        merged = data
+                        if merge and data:
+                            await pipe.watch(data_key)
+                            raw = await pipe.get(data_key)
+                            if raw:
+                                merged = {**self.json_loads(raw), **data}
+                            pipe.multi()
+                        if state is None:
+                            pipe.delete(state_key)
+                        else:
+                            pipe.set(state_key, state.state if isinstance(state, State) else state, ex=self.state_ttl)
+                        if merged:
+                            pipe.set(data_key, self.json_dumps(merged), ex=self.data_ttl)
+                        elif not merge:
+                            pipe.delete(data_key)
+                        await pipe.execute()
+                        return
+                    except WatchError:
+                        continue
+
+
+def create_storage() -> BaseStorage:
+    """Create the FSM storage: Redis when REDIS_URL is set, otherwise in memory
+
+    Redis keeps FSM state outside the process so several bot workers can share it.
+    """
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        return BatchedMemoryStorage()
+    if RedisStorage is None:
+        raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+    return BatchedRedisStorage.from_url(
+        redis_url,
+        key_builder=DefaultKeyBuilder(with_destiny=True),
+        json_loads=orjson.loads,
+        json_dumps=lambda data: orjson.dumps(data).decode(),
+    )
+
+
+async def set_state_and_data(state: FSMContext, new_state: StateType, **data: Any) -> None:
+    """Set FSM state and merge data with one storage write when supported
+
+    Args:
+        state: FSM context of the current user
+        new_state: State to switch to
+        **data: Values to merge into the state data
+    """
+    await _write_state(state, new_state, data, merge=True)
+
+
+async def reset_state(state: FSMContext, language: Optional[str] = None) -> None:
+    """Clear FSM state and data but keep the user's language choice, in one write
+
+    Args:
+        state: FSM context of the current user
+        language: Language to keep; defaults to the one already stored
+    """
+    if language is None:
+        language = await state.get_value('language')
+    await _write_state(state, None, {'language': language} if language else {}, merge=False)
+
+
+async def _write_state(state: FSMContext, new_state: StateType, data: Dict[str, Any], merge: bool) -> None:
+    """Set FSM state and merge or replace its data, in one write when supported"""
+    storage = state.storage
+    if hasattr(storage, 'set_state_and_data'):
+        await storage.set_state_and_data(state.key, new_state, data, merge=merge)
+        return
+
+    # Storage without combined writes: fall back to two calls
+    if not merge:
+        await state.set_data(data)
+    elif data:
+        await state.update_data(**data)
+    await state.set_state(new_state)